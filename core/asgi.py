@@ -3,6 +3,9 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live vote stream (``/vote/events/``) is only served under ASGI, e.g.
+``gunicorn core.asgi:application -k uvicorn.workers.UvicornWorker``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 """
@@ -200,6 +200,17 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # IMDb API Configuration
 OMDB_API_KEY = os.environ.get('OMDB_API_KEY', None)
 
+# Background refresh of stale proposal IMDb data (see home/imdb.py)
+IMDB_REFRESH_WORKERS = int(os.environ.get('IMDB_REFRESH_WORKERS', 2))
+IMDB_REFRESH_TIMEOUT = 5  # seconds per upstream request
+
+# Buffered LogEntry writes (see home/audit.py)
+AUDIT_LOG_ASYNC = str2bool(os.environ.get('AUDIT_LOG_ASYNC', 'True'))
+AUDIT_LOG_BATCH_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL = 2.0  # seconds
+AUDIT_LOG_MAX_BUFFER = 5000
+LOG_RETENTION_DAYS = 90  # default age for the prune_logs command
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Cache Control Headers for Static Files (WhiteNoise Configuration)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class HomeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "home"
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals  # connects the model receivers
+
+        post_migrate.connect(signals.ensure_search_index, sender=self)
@@ -0,0 +1,119 @@
+"""
+Buffered audit log writer for LogEntry.
+
+``log_action`` in the views only enqueues an unsaved LogEntry; a background
+thread (one per worker process) writes the buffer with ``bulk_create`` when
+it reaches ``AUDIT_LOG_BATCH_SIZE`` entries or every
+``AUDIT_LOG_FLUSH_INTERVAL`` seconds, so requests never wait on the INSERT.
+The buffer is flushed on interpreter shutdown. When it is full (the database
+is slow or down) entries are written synchronously instead of being dropped.
+
+Set ``AUDIT_LOG_ASYNC = False`` to write every entry inline; tests can also
+call ``audit_logger.flush()`` to drain the buffer on demand.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogger:
+    def __init__(self, batch_size=None, flush_interval=None, max_buffer=None):
+        self.batch_size = batch_size or getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 100)
+        self.flush_interval = flush_interval or getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 2.0)
+        self.max_buffer = max_buffer or getattr(settings, 'AUDIT_LOG_MAX_BUFFER', 5000)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._reset()
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue(maxsize=self.max_buffer)
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _check_fork(self):
+        # A forked worker inherits the parent's buffer (whose entries the
+        # parent still owns) but not its thread: start over with an empty one
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _ensure_worker(self):
+        with self._lock:
+            self._check_fork()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+
+    def log(self, **fields):
+        """Record a LogEntry built from ``fields``; written later unless async logging is off."""
+        from .models import LogEntry
+
+        entry = LogEntry(**fields)
+        if not getattr(settings, 'AUDIT_LOG_ASYNC', True):
+            entry.save()
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # Back-pressure: never lose an audit entry, pay for the INSERT instead
+            entry.save()
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def _drain(self):
+        entries = []
+        while True:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                return entries
+
+    def flush(self):
+        """Write all buffered entries now, in the calling thread. Returns the number written."""
+        from .models import LogEntry
+
+        with self._lock:
+            self._check_fork()
+        with self._flush_lock:
+            entries = self._drain()
+            if not entries:
+                return 0
+            try:
+                LogEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+            except Exception:
+                # e.g. a user deleted before the flush; save what can be saved
+                logger.exception("Audit log bulk write failed, retrying entries one by one")
+                for entry in entries:
+                    entry.pk = None
+                    try:
+                        entry.save()
+                    except Exception:
+                        logger.warning("Dropping audit entry %s: could not be saved", entry.action)
+            return len(entries)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit log flush failed")
+            finally:
+                # Worker thread owns its connection; don't leave it open between flushes
+                connections.close_all()
+
+
+audit_logger = AuditLogger()
@@ -0,0 +1,112 @@
+"""
+Monotonic per-domain data versions shared by all processes.
+
+Writers bump the version of the domain they touched (after the transaction
+commits); readers build cache keys from the current versions, so stale
+entries are never read again and simply expire. Domains:
+
+    proposals - MovieProposal rows (including cached IMDb data)
+    votes     - ProposalVote rows and vote counters
+    media     - Media rows (watched/skipped state, catalog data); bumped by
+                the post_save/post_delete receivers in home/signals.py
+    ratings   - MovieRating rows and rating summaries
+
+The versions live in the DataVersion table rather than in the cache: the
+cache is per process (LocMemCache), and a bump made in one gunicorn worker
+or in a management command has to reach every worker. Reading them costs
+one indexed query.
+
+The same versions drive HTTP validation: ``versioned_etag`` turns them into
+an ETag so polling clients get a 304 without the view running.
+
+A missing version row is seeded from the current time in milliseconds, so
+versions keep increasing even if the table is emptied.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+# Cache entries keyed by data versions are never read once stale, so their
+# timeout only bounds memory use and how long a write that forgot to bump
+# its domain can go unnoticed.
+VERSIONED_CACHE_TIMEOUT = 300
+
+def _seed():
+    return int(time.time() * 1000)
+
+
+def _create_missing(domains):
+    for domain in domains:
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(domain=domain, value=_seed())
+        except IntegrityError:
+            # Created concurrently by another process
+            pass
+
+
+def get_versions(*domains):
+    """Return {domain: version} for the given domains in one query."""
+    versions = dict(DataVersion.objects.filter(domain__in=domains).values_list('domain', 'value'))
+    missing = [domain for domain in domains if domain not in versions]
+    if missing:
+        _create_missing(missing)
+        versions.update(DataVersion.objects.filter(domain__in=missing).values_list('domain', 'value'))
+    return versions
+
+
+def get_version(domain):
+    return get_versions(domain)[domain]
+
+
+def _bump(domains):
+    updated = DataVersion.objects.filter(domain__in=domains).update(value=F('value') + 1)
+    if updated < len(set(domains)):
+        # Rows missing: start above anything handed out before
+        existing = set(DataVersion.objects.filter(domain__in=domains).values_list('domain', flat=True))
+        _create_missing([domain for domain in set(domains) if domain not in existing])
+
+
+def bump_version(*domains):
+    """Invalidate everything cached for ``domains`` once the current transaction commits."""
+    transaction.on_commit(lambda: _bump(domains))
+
+
+def versioned_etag(*domains):
+    """
+    View decorator answering ``If-None-Match`` from the data versions of ``domains``.
+
+    The ETag also covers the user and the full path (query string included),
+    so per-user and paginated responses validate separately, and the CSRF
+    secret, so a page embedding ``{{ csrf_token }}`` is re-rendered after the
+    token rotates (e.g. on login) instead of serving a stale one. A matching GET
+    returns 304 before the view (and its queries) runs. Responses are marked
+    private/no-cache so browsers always revalidate instead of guessing.
+    """
+    def etag_func(request, *args, **kwargs):
+        versions = get_versions(*domains)
+        user = getattr(request, 'user', None)
+        parts = [f'{domain}={versions[domain]}' for domain in domains]
+        parts.append(f'user={user.pk if user is not None and user.is_authenticated else 0}')
+        parts.append(f"csrf={request.META.get('CSRF_COOKIE', '')}")
+        parts.append(request.get_full_path())
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,71 @@
+"""
+In-process broadcast of vote and proposal deltas for the Server-Sent Events
+stream (``vote_events`` view).
+
+Sync views call ``publish()``; the event is delivered after the current
+transaction commits to every subscribed client queue, on that client's
+event loop. Each subscriber is an ``asyncio.Queue``, so an idle connection
+costs no thread under ASGI. Slow clients that fall behind drop events and
+catch up on reconnect (the page reloads data then).
+
+Events only reach clients connected to the same process; running several
+workers needs a shared channel (e.g. Redis pub/sub) instead. The render.yaml
+deployment (gunicorn WSGI, WEB_CONCURRENCY=4) meets neither condition, so
+there the stream is off and the vote page works without live updates.
+"""
+import asyncio
+import itertools
+import threading
+
+from django.db import transaction
+
+
+class Broadcaster:
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self):
+        """Register a queue on the running event loop. Returns the subscription."""
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.max_queue))
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def send(self, event, data):
+        """Deliver an event to all subscribers now. Safe to call from any thread."""
+        message = (next(self._ids), event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            loop, queue = subscription
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # Event loop already closed
+                self.unsubscribe(subscription)
+
+    @staticmethod
+    def _deliver(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+
+broadcaster = Broadcaster()
+
+
+def publish(event, **data):
+    """Broadcast ``event`` with ``data`` once the current transaction commits."""
+    transaction.on_commit(lambda: broadcaster.send(event, data))
@@ -0,0 +1,177 @@
+"""
+IMDb (api.imdbapi.dev) helpers shared by the views and management commands.
+
+The vote page never calls the API inline: it renders whatever is cached on
+``MovieProposal.cached_imdb_data`` (even if stale) and hands expired ids to
+the in-process ``refresher``, which fetches them on a small worker pool and
+writes the results back with a single ``bulk_update``.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from .data_versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+IMDB_TITLE_URL = "https://api.imdbapi.dev/titles/{imdb_id}"
+
+# Cached IMDb data older than this is refreshed in the background
+IMDB_CACHE_TTL = timedelta(hours=24)
+
+
+def extract_imdb_data(payload):
+    """Convert an imdbapi.dev title payload into the dict cached on proposals."""
+    d = payload.get('title', {}) or payload
+    img = d.get('primaryImage') or {}
+    rating = d.get('rating') or {}
+
+    return {
+        "title": d.get('primaryTitle') or d.get('originalTitle') or "",
+        "year": d.get('startYear') or "",
+        "plot": (d.get('plotOutline', {}).get('text') if isinstance(d.get('plotOutline'), dict) else ""),
+        "runtime": d.get('runtimeSeconds'),
+        "genres": d.get('genres') or [],
+        "poster": img.get('url') if isinstance(img, dict) else "",
+        "imdb_rating": rating.get('aggregateRating'),
+        "imdb_votes": rating.get('voteCount'),
+    }
+
+
+def fetch_imdb_data(imdb_id, session=None, timeout=5):
+    """Fetch a single title. Returns the cached-data dict, or None on a non-200 response."""
+    http = session or requests
+    resp = http.get(IMDB_TITLE_URL.format(imdb_id=imdb_id), timeout=timeout)
+    if resp.status_code != 200:
+        return None
+    return extract_imdb_data(resp.json())
+
+
+def build_session(pool_size=10, retries=3, backoff=0.5):
+    """
+    Keep-alive session for api.imdbapi.dev with retry/backoff on transient errors.
+
+    ``pool_size`` should be at least the number of threads sharing the session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at most ``rate`` per second (0 disables it)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def is_cache_expired(proposal, now=None):
+    """True if the proposal has an IMDb id and its cached data is missing or older than the TTL."""
+    if not proposal.imdb_id:
+        return False
+    now = now or timezone.now()
+    return not proposal.cached_at or (now - proposal.cached_at > IMDB_CACHE_TTL)
+
+
+class ImdbRefresher:
+    """
+    Background refresher for proposal IMDb data.
+
+    Ids are deduplicated against those already queued or running, so a burst
+    of page views schedules each stale proposal only once per process.
+    """
+
+    def __init__(self, max_workers=None, timeout=None):
+        self.max_workers = max_workers or getattr(settings, 'IMDB_REFRESH_WORKERS', 2)
+        self.timeout = timeout or getattr(settings, 'IMDB_REFRESH_TIMEOUT', 5)
+        self._executor = None
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='imdb-refresh',
+            )
+        return self._executor
+
+    def schedule(self, proposal_ids):
+        """Queue proposals for refresh. Returns the ids that were actually queued."""
+        with self._lock:
+            new_ids = [pid for pid in dict.fromkeys(proposal_ids) if pid not in self._in_flight]
+            if not new_ids:
+                return []
+            self._in_flight.update(new_ids)
+            executor = self._get_executor()
+
+        executor.submit(self._refresh, new_ids)
+        return new_ids
+
+    def _refresh(self, proposal_ids):
+        from .models import MovieProposal
+
+        close_old_connections()
+        try:
+            proposals = list(
+                MovieProposal.objects.filter(id__in=proposal_ids, imdb_id__isnull=False)
+                .only('id', 'imdb_id', 'cached_imdb_data', 'cached_at')
+            )
+            to_update = []
+            with requests.Session() as session:
+                for p in proposals:
+                    try:
+                        imdb_data = fetch_imdb_data(p.imdb_id, session=session, timeout=self.timeout)
+                    except Exception as e:
+                        logger.warning("Error fetching IMDb data for %s: %s", p.imdb_id, e)
+                        continue
+                    if imdb_data is None:
+                        continue
+                    p.cached_imdb_data = imdb_data
+                    p.cached_at = timezone.now()
+                    to_update.append(p)
+
+            if to_update:
+                MovieProposal.objects.bulk_update(to_update, ['cached_imdb_data', 'cached_at'], batch_size=100)
+                bump_version('proposals')
+        except Exception:
+            logger.exception("IMDb background refresh failed")
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(proposal_ids)
+            # Worker threads own their connections; don't leave them open
+            connections.close_all()
+
+
+refresher = ImdbRefresher()
@@ -13,7 +13,7 @@ def import_media_csv(file_path):
                     duration=row['Duration'],
                     age_rating=row['Age Rating'],
                     rating=float(row['Rating']),
-                    votes=int(row['Votes']),
+                    votes=row['Votes'],  # votes_count is parsed from it on save
                     metascore=int(row['Metascore']) if row['Metascore'] else None,
                     description=row['Description'],
                     watched=row['Watched'].lower() == 'true',
@@ -10,7 +10,8 @@ Usage: python manage.py cleanup_orphaned_votes
 from django.core.management.base import BaseCommand
 from django.db.models import Q
 
-from home.models import ProposalVote
+from home.data_versions import bump_version
+from home.models import MovieProposal, ProposalVote
 
 
 class Command(BaseCommand):
@@ -47,7 +48,10 @@ class Command(BaseCommand):
             if count > 5:
                 self.stdout.write(f'  ... and {count - 5} more')
         else:
+            proposal_ids = list(orphaned_votes.values_list('proposal_id', flat=True).distinct())
             deleted_count, _ = orphaned_votes.delete()
+            MovieProposal.recount_votes(MovieProposal.objects.filter(id__in=proposal_ids))
+            bump_version('votes')
             self.stdout.write(
                 self.style.SUCCESS(
                     f'✓ Cleanup complete: {deleted_count} orphaned vote(s) removed'
@@ -4,15 +4,81 @@ Management command to import CSV data into the Media Django model.
 This command reads the CSV file and creates Media objects in the database
 instead of relying on CSV file I/O.
 
+Rows are parsed in a single pass and written in batches with one
+INSERT ... ON CONFLICT (number) DO UPDATE per batch, all inside one
+transaction: the import either applies completely or not at all.
+
 Usage: python manage.py import_csv_to_db <csv_file_path>
-Example: python manage.py import_csv_to_db media/data.csv
+Example: python manage.py import_csv_to_db media/data.csv --batch 2000
 """
 import csv
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.db import DatabaseError, transaction
 import os
 
-from home.models import Media
+from home.data_versions import bump_version
+from home.models import Media, MovieRating, MovieRatingSummary
+
+# Expected columns
+EXPECTED_FIELDS = {
+    'Number', 'Title', 'Year', 'Duration', 'Age Rating',
+    'Rating', 'Votes', 'Metascore', 'Description',
+    'Watched', 'Skipped', 'Series', 'Poster URL'
+}
+
+# Columns overwritten when a movie with the same number already exists
+UPDATE_FIELDS = [
+    'title', 'year', 'duration', 'age_rating', 'rating', 'votes', 'metascore',
+    'description', 'watched', 'skipped', 'series', 'poster_url',
+    *Media.DERIVED_FIELDS.values(), 'updated_at',
+]
+
+
+def parse_row(row):
+    """Build an unsaved Media from a CSV row. Raises ValueError with a readable message."""
+    try:
+        number = int(row['Number'].strip())
+    except (ValueError, AttributeError):
+        raise ValueError(f'Invalid Number "{row.get("Number")}"')
+
+    try:
+        year = int(row['Year'].strip())
+    except (ValueError, AttributeError):
+        raise ValueError(f'Invalid Year "{row.get("Year")}"')
+
+    try:
+        rating = float(row['Rating'].strip())
+    except (ValueError, AttributeError):
+        raise ValueError(f'Invalid Rating "{row.get("Rating")}"')
+
+    # Parse metascore (optional)
+    metascore = None
+    if (row.get('Metascore') or '').strip():
+        try:
+            metascore = int(row['Metascore'].strip())
+        except ValueError:
+            pass
+
+    media = Media(
+        number=number,
+        title=row['Title'].strip(),
+        year=year,
+        duration=row['Duration'].strip(),
+        age_rating=row['Age Rating'].strip(),
+        rating=rating,
+        votes=row['Votes'].strip(),
+        metascore=metascore,
+        description=row['Description'].strip(),
+        # Parse boolean fields
+        watched=(row.get('Watched') or 'FALSE').strip().upper() == 'TRUE',
+        skipped=(row.get('Skipped') or 'FALSE').strip().upper() == 'TRUE',
+        series=(row.get('Series') or 'FALSE').strip().upper() == 'TRUE',
+        poster_url=(row.get('Poster URL') or '').strip() or None,
+    )
+    # bulk_create bypasses save(), which normally fills these
+    media.refresh_derived_fields()
+    return media
 
 
 class Command(BaseCommand):
@@ -34,149 +100,132 @@ class Command(BaseCommand):
             action='store_true',
             help='Delete all existing Media records before importing',
         )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=1000,
+            help='Number of rows written per INSERT ... ON CONFLICT statement (default: 1000)',
+        )
 
     def handle(self, *args, **options):
         csv_file = options['csv_file']
         skip_existing = options.get('skip_existing', False)
         clear_existing = options.get('clear', False)
-        
+        batch_size = options['batch']
+        verbosity = options.get('verbosity', 1)
+        if batch_size < 1:
+            raise CommandError('--batch must be at least 1')
+
         # Determine full path to CSV file
         if os.path.isabs(csv_file):
             csv_path = csv_file
         else:
             csv_path = os.path.join(settings.MEDIA_ROOT, csv_file)
-        
+
         if not os.path.exists(csv_path):
             raise CommandError(f'CSV file not found: {csv_path}')
-        
-        # Clear existing data if requested
-        if clear_existing:
-            deleted_count, _ = Media.objects.all().delete()
-            self.stdout.write(
-                self.style.WARNING(f'Deleted {deleted_count} existing Media records')
-            )
-        
+
         created_count = 0
         updated_count = 0
         skipped_count = 0
         error_count = 0
-        
+        linked_count = 0
+        written = 0
+
+        def write_batch(batch):
+            # Keyed by number: a repeated number within one statement would make
+            # ON CONFLICT update the same row twice (an error on PostgreSQL)
+            Media.objects.bulk_create(
+                batch.values(),
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['number'],
+                update_fields=UPDATE_FIELDS,
+            )
+            nonlocal written
+            written += len(batch)
+            if verbosity >= 1:
+                self.stdout.write(
+                    f'  … {written} rows written',
+                    ending='\r' if self.stdout.isatty() else '\n',
+                )
+
         try:
-            with open(csv_path, 'r', encoding='utf-8') as csvfile:
+            with open(csv_path, 'r', encoding='utf-8') as csvfile, transaction.atomic():
                 reader = csv.DictReader(csvfile)
-                
+
                 if not reader.fieldnames:
                     raise CommandError('CSV file is empty or invalid')
-                
-                # Expected columns
-                expected_fields = {
-                    'Number', 'Title', 'Year', 'Duration', 'Age Rating',
-                    'Rating', 'Votes', 'Metascore', 'Description',
-                    'Watched', 'Skipped', 'Series', 'Poster URL'
-                }
-                
-                if not all(field in reader.fieldnames for field in expected_fields):
+
+                if not all(field in reader.fieldnames for field in EXPECTED_FIELDS):
                     raise CommandError(
-                        f'CSV must have columns: {expected_fields}'
+                        f'CSV must have columns: {EXPECTED_FIELDS}'
+                    )
+
+                # Clear existing data if requested (rolled back if the import fails)
+                if clear_existing:
+                    deleted_count, _ = Media.objects.all().delete()
+                    self.stdout.write(
+                        self.style.WARNING(f'Deleted {deleted_count} existing Media records')
                     )
-                
+
+                # One query up front tells creates from updates
+                existing = set() if clear_existing else set(Media.objects.values_list('number', flat=True))
+
+                batch = {}
                 for row_num, row in enumerate(reader, start=2):  # Start at 2 (skip header)
                     try:
-                        # Parse and validate data
-                        try:
-                            number = int(row['Number'].strip())
-                        except (ValueError, AttributeError):
-                            self.stdout.write(
-                                self.style.ERROR(
-                                    f'Row {row_num}: Invalid Number "{row.get("Number")}"'
-                                )
-                            )
-                            error_count += 1
-                            continue
-                        
-                        try:
-                            year = int(row['Year'].strip())
-                        except (ValueError, AttributeError):
-                            self.stdout.write(
-                                self.style.ERROR(
-                                    f'Row {row_num}: Invalid Year "{row.get("Year")}"'
-                                )
-                            )
-                            error_count += 1
-                            continue
-                        
-                        try:
-                            rating = float(row['Rating'].strip())
-                        except (ValueError, AttributeError):
-                            self.stdout.write(
-                                self.style.ERROR(
-                                    f'Row {row_num}: Invalid Rating "{row.get("Rating")}"'
-                                )
-                            )
-                            error_count += 1
-                            continue
-                        
-                        # Parse metascore (optional)
-                        metascore = None
-                        if row.get('Metascore', '').strip():
-                            try:
-                                metascore = int(row['Metascore'].strip())
-                            except ValueError:
-                                pass
-                        
-                        # Parse boolean fields
-                        watched = row.get('Watched', 'FALSE').strip().upper() == 'TRUE'
-                        skipped = row.get('Skipped', 'FALSE').strip().upper() == 'TRUE'
-                        series = row.get('Series', 'FALSE').strip().upper() == 'TRUE'
-                        
-                        # Get or create Media object
-                        media_data = {
-                            'title': row['Title'].strip(),
-                            'year': year,
-                            'duration': row['Duration'].strip(),
-                            'age_rating': row['Age Rating'].strip(),
-                            'rating': rating,
-                            'votes': row['Votes'].strip(),
-                            'metascore': metascore,
-                            'description': row['Description'].strip(),
-                            'watched': watched,
-                            'skipped': skipped,
-                            'series': series,
-                            'poster_url': row.get('Poster URL', '').strip() or None,
-                        }
-                        
-                        media, created = Media.objects.update_or_create(
-                            number=number,
-                            defaults=media_data
-                        )
-                        
-                        if created:
-                            created_count += 1
-                            self.stdout.write(
-                                self.style.SUCCESS(
-                                    f'✓ Created: {number}. {media.title} ({year})'
-                                )
-                            )
-                        else:
-                            if skip_existing:
-                                skipped_count += 1
-                            else:
-                                updated_count += 1
-                                self.stdout.write(
-                                    self.style.WARNING(
-                                        f'⟳ Updated: {number}. {media.title} ({year})'
-                                    )
-                                )
-                    
+                        media = parse_row(row)
                     except Exception as e:
                         error_count += 1
                         self.stdout.write(
                             self.style.ERROR(f'Row {row_num}: {str(e)}')
                         )
-        
-        except Exception as e:
-            raise CommandError(f'Error reading CSV file: {str(e)}')
-        
+                        continue
+
+                    if media.number in existing:
+                        if skip_existing:
+                            skipped_count += 1
+                            continue
+                        updated_count += 1
+                        if verbosity >= 2:
+                            self.stdout.write(
+                                self.style.WARNING(f'⟳ Updated: {media.number}. {media.title} ({media.year})')
+                            )
+                    else:
+                        existing.add(media.number)
+                        created_count += 1
+                        if verbosity >= 2:
+                            self.stdout.write(
+                                self.style.SUCCESS(f'✓ Created: {media.number}. {media.title} ({media.year})')
+                            )
+
+                    if media.number in batch:
+                        write_batch(batch)
+                        batch = {}
+                    batch[media.number] = media
+                    if len(batch) >= batch_size:
+                        write_batch(batch)
+                        batch = {}
+
+                if batch:
+                    write_batch(batch)
+
+                # Ratings detached by --clear (SET_NULL) or by an earlier delete
+                # belong to the imported rows again; --clear also dropped the summaries
+                linked_count = MovieRating.link_unresolved()
+                if clear_existing or linked_count:
+                    MovieRatingSummary.rebuild()
+
+                if clear_existing or created_count or updated_count or linked_count:
+                    # bulk_create sends no post_save signals
+                    bump_version('media', 'ratings')
+
+        except CommandError:
+            raise
+        except (OSError, csv.Error, DatabaseError) as e:
+            raise CommandError(f'Error importing CSV file (nothing was saved): {str(e)}')
+
         # Summary
         self.stdout.write(
             self.style.SUCCESS(
@@ -185,6 +234,7 @@ class Command(BaseCommand):
                 f'  Updated: {updated_count}\n'
                 f'  Skipped: {skipped_count}\n'
                 f'  Errors: {error_count}\n'
+                f'  Ratings re-linked: {linked_count}\n'
                 f'  Total in database: {Media.objects.count()}'
             )
         )
@@ -0,0 +1,73 @@
+"""
+Management command to merge movie proposals whose titles only differ by
+case, accents or spacing (same normalize_title key).
+
+Migration 0018_populate_title_keys refuses to run while such duplicates
+exist, because MovieProposal.title_key is unique. For every group the
+oldest proposal is kept; the votes of the others are moved onto it (a voter
+who voted for several keeps one vote) and the emptied duplicates are
+deleted. Run it after 0017 is applied, then run migrate again. It bumps
+no data versions: before 0020 there is no DataVersion table, and once 0019
+is applied duplicates cannot exist.
+
+Usage: python manage.py merge_duplicate_proposals
+Example: python manage.py merge_duplicate_proposals --dry-run
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from home.models import MovieProposal, ProposalVote
+from home.utils import normalize_title
+
+
+def duplicate_groups():
+    """Lists of (id, title) with the same title key, oldest first; only groups of two or more."""
+    groups = {}
+    for proposal_id, title in MovieProposal.objects.order_by('created_at', 'id').values_list('id', 'title'):
+        groups.setdefault(normalize_title(title), []).append((proposal_id, title))
+    return [group for group in groups.values() if len(group) > 1]
+
+
+class Command(BaseCommand):
+    help = 'Merge movie proposals whose titles normalize to the same key'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the proposals that would be merged',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run', False)
+
+        with transaction.atomic():
+            groups = duplicate_groups()
+            if not groups:
+                self.stdout.write(self.style.SUCCESS('✓ No duplicate proposals found.'))
+                return
+
+            for (keeper_id, keeper_title), *duplicates in groups:
+                for proposal_id, title in duplicates:
+                    if dry_run:
+                        self.stdout.write(f'  • Would merge {proposal_id}. "{title}" into {keeper_id}. "{keeper_title}"')
+                        continue
+                    voters = ProposalVote.objects.filter(proposal_id=keeper_id).values('voter_id')
+                    moved = ProposalVote.objects.filter(proposal_id=proposal_id).exclude(
+                        voter_id__in=voters
+                    ).update(proposal_id=keeper_id)
+                    # Whatever is left duplicates a vote the keeper already has
+                    ProposalVote.objects.filter(proposal_id=proposal_id).delete()
+                    MovieProposal.objects.filter(pk=proposal_id).delete()
+                    self.stdout.write(
+                        f'  • Merged {proposal_id}. "{title}" into {keeper_id}. "{keeper_title}" ({moved} votes moved)'
+                    )
+
+            if dry_run:
+                self.stdout.write('Run without --dry-run to merge them.')
+                return
+
+            MovieProposal.recount_votes(MovieProposal.objects.filter(pk__in=[group[0][0] for group in groups]))
+
+        merged = sum(len(group) - 1 for group in groups)
+        self.stdout.write(self.style.SUCCESS(f'✓ Merged {merged} duplicate proposal(s)'))
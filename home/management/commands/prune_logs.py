@@ -0,0 +1,94 @@
+"""
+Management command to enforce the LogEntry retention policy.
+
+Deletes log entries older than the given age in primary-key chunks, each in
+its own short transaction, optionally archiving them to a gzipped JSON Lines
+file first. Meant to run periodically (e.g. daily via cron).
+
+Usage: python manage.py prune_logs
+Example: python manage.py prune_logs --older-than 90d --batch 5000 --archive
+"""
+import gzip
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from home.models import LogEntry
+
+AGE_UNITS = {'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+
+def parse_age(value):
+    """Parse an age like '90d', '12h' or '2w' into a timedelta."""
+    match = re.fullmatch(r'\s*(\d+)\s*([hdw]?)\s*', value or '')
+    if not match:
+        raise CommandError(f'Invalid age "{value}" (expected e.g. 90d, 12h, 2w)')
+    return timedelta(**{AGE_UNITS[match.group(2) or 'd']: int(match.group(1))})
+
+
+class Command(BaseCommand):
+    help = 'Delete (and optionally archive) log entries older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            default=f"{getattr(settings, 'LOG_RETENTION_DAYS', 90)}d",
+            help='Age of entries to delete, e.g. 90d, 12h, 2w (default: LOG_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=5000,
+            help='Number of entries deleted per transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--archive',
+            nargs='?',
+            const='',
+            default=None,
+            help='Write deleted entries to a gzipped JSONL file first '
+                 '(default path: MEDIA_ROOT/log_archives/logs_<timestamp>.jsonl.gz)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the entries that would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - parse_age(options['older_than'])
+        batch_size = options['batch']
+        if batch_size < 1:
+            raise CommandError('--batch must be at least 1')
+
+        if options.get('dry_run', False):
+            count = LogEntry.objects.filter(timestamp__lt=cutoff).count()
+            self.stdout.write(
+                self.style.WARNING(f'⚠ DRY RUN: {count} log entries older than {cutoff:%Y-%m-%d %H:%M} would be deleted')
+            )
+            return
+
+        archive_path = options['archive']
+        if archive_path is None:
+            deleted = LogEntry.purge(before=cutoff, batch_size=batch_size)
+        else:
+            if not archive_path:
+                archive_dir = os.path.join(settings.MEDIA_ROOT, 'log_archives')
+                os.makedirs(archive_dir, exist_ok=True)
+                archive_path = os.path.join(
+                    archive_dir, f"logs_{timezone.now():%Y-%m-%d_%H-%M-%S}.jsonl.gz"
+                )
+            with gzip.open(archive_path, 'wt', encoding='utf-8') as archive:
+                deleted = LogEntry.purge(before=cutoff, batch_size=batch_size, archive=archive)
+            if deleted:
+                self.stdout.write(f'Archived {deleted} entries to {archive_path}')
+            else:
+                os.remove(archive_path)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Deleted {deleted} log entries older than {cutoff:%Y-%m-%d %H:%M}')
+        )
@@ -0,0 +1,30 @@
+"""
+Management command to rebuild MovieRatingSummary from MovieRating.
+
+rate_movie and remove_movie_rating keep the summaries in sync; this command
+repairs them after manual data fixes, restores or cascading user deletes.
+Ratings that lost their Media (e.g. after import_csv_to_db --clear) are
+re-linked by title first.
+
+Usage: python manage.py rebuild_rating_summaries
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from home.data_versions import bump_version
+from home.models import MovieRating, MovieRatingSummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-movie rating summaries (sum, count, histogram) from individual ratings'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            linked = MovieRating.link_unresolved()
+            count = MovieRatingSummary.rebuild()
+            bump_version('ratings')
+        if linked:
+            self.stdout.write(f'Re-linked {linked} rating(s) to movies by title')
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Rebuilt rating summaries for {count} movie(s)')
+        )
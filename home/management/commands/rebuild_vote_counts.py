@@ -0,0 +1,61 @@
+"""
+Management command to rebuild or verify the denormalized MovieProposal.vote_count.
+
+vote_proposal keeps the counter in sync atomically; this command repairs it
+after bulk deletes, manual data fixes or restores.
+
+Usage: python manage.py rebuild_vote_counts
+Example: python manage.py rebuild_vote_counts --verify
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from home.data_versions import bump_version
+from home.models import MovieProposal, ProposalVote
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify denormalized vote counts on movie proposals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report proposals whose counter does not match, without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        if options.get('verify', False):
+            self.verify()
+            return
+
+        with transaction.atomic():
+            updated = MovieProposal.recount_votes()
+            bump_version('votes')
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Rebuilt vote counts for {updated} proposal(s)')
+        )
+
+    def verify(self):
+        actual = dict(
+            ProposalVote.objects.order_by().values_list('proposal_id').annotate(c=Count('pk'))
+        )
+        mismatched = [
+            (proposal_id, title, stored, actual.get(proposal_id, 0))
+            for proposal_id, title, stored in MovieProposal.objects.values_list('id', 'title', 'vote_count')
+            if stored != actual.get(proposal_id, 0)
+        ]
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('✓ All vote counts are consistent.'))
+            return
+
+        self.stdout.write(
+            self.style.WARNING(f'⚠ Found {len(mismatched)} proposal(s) with wrong vote counts')
+        )
+        for proposal_id, title, stored, expected in mismatched[:20]:
+            self.stdout.write(f'  • {proposal_id}. {title}: stored {stored}, actual {expected}')
+        if len(mismatched) > 20:
+            self.stdout.write(f'  ... and {len(mismatched) - 20} more')
+        self.stdout.write('Run without --verify to fix them.')
@@ -2,14 +2,22 @@
 Management command to refresh stale IMDb cache for movie proposals.
 Can be run periodically via cron or Celery task.
 
+Titles are fetched on a thread pool sharing one keep-alive session (with
+retry/backoff and a per-host rate limit) and written back with a single
+batched bulk_update.
+
 Usage: python manage.py refresh_imdb_cache
+Example: python manage.py refresh_imdb_cache --concurrency 8 --rate 10 --limit 0
 """
-from django.core.management.base import BaseCommand
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from django.db import models
 from datetime import timedelta
-import requests
+import time
 
+from home.data_versions import bump_version
+from home.imdb import RateLimiter, build_session, fetch_imdb_data
 from home.models import MovieProposal
 
 
@@ -27,74 +35,104 @@ class Command(BaseCommand):
             '--limit',
             type=int,
             default=50,
-            help='Maximum number of proposals to refresh per run (default: 50)',
+            help='Maximum number of proposals to refresh per run, 0 for no limit (default: 50)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of parallel requests to the IMDb API (default: 1)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=5,
+            help='Maximum requests per second to the IMDb API, 0 for no limit (default: 5)',
+        )
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=3,
+            help='Retries with exponential backoff for failed requests (default: 3)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=5,
+            help='Timeout per request in seconds (default: 5)',
         )
 
     def handle(self, *args, **options):
         cache_hours = options['hours']
         limit = options['limit']
-        
+        concurrency = options['concurrency']
+        timeout = options['timeout']
+
+        if concurrency < 1:
+            raise CommandError('--concurrency must be at least 1')
+
         # Find proposals with stale or missing cache
         cutoff_time = timezone.now() - timedelta(hours=cache_hours)
         stale_proposals = MovieProposal.objects.filter(
             imdb_id__isnull=False
         ).filter(
             models.Q(cached_at__isnull=True) | models.Q(cached_at__lt=cutoff_time)
-        )[:limit]
-        
-        updated_count = 0
-        error_count = 0
-        
-        for proposal in stale_proposals:
+        ).only('id', 'title', 'imdb_id', 'cached_imdb_data', 'cached_at')
+        if limit > 0:
+            stale_proposals = stale_proposals[:limit]
+        stale_proposals = list(stale_proposals)
+
+        if not stale_proposals:
+            self.stdout.write(self.style.SUCCESS('✓ No stale IMDb cache entries found.'))
+            return
+
+        session = build_session(pool_size=concurrency, retries=options['retries'])
+        limiter = RateLimiter(options['rate'])
+
+        def fetch(proposal):
+            limiter.wait()
             try:
-                url = f"https://api.imdbapi.dev/titles/{proposal.imdb_id}"
-                resp = requests.get(url, timeout=5)
-                
-                if resp.status_code == 200:
-                    payload = resp.json()
-                    d = payload.get('title', {}) or payload
-                    img = d.get('primaryImage') or {}
-                    rating = d.get('rating') or {}
-                    
-                    imdb_data = {
-                        "title": d.get('primaryTitle') or d.get('originalTitle') or "",
-                        "year": d.get('startYear') or "",
-                        "plot": (d.get('plotOutline', {}).get('text') if isinstance(d.get('plotOutline'), dict) else ""),
-                        "runtime": d.get('runtimeSeconds'),
-                        "genres": d.get('genres') or [],
-                        "poster": img.get('url') if isinstance(img, dict) else "",
-                        "imdb_rating": rating.get('aggregateRating'),
-                        "imdb_votes": rating.get('voteCount'),
-                    }
-                    
-                    proposal.cached_imdb_data = imdb_data
-                    proposal.cached_at = timezone.now()
-                    proposal.save()
-                    updated_count += 1
-                    
+                return proposal, fetch_imdb_data(proposal.imdb_id, session=session, timeout=timeout), None
+            except Exception as e:
+                return proposal, None, e
+
+        updated = []
+        error_count = 0
+        started = time.monotonic()
+
+        with session, ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for proposal, imdb_data, error in executor.map(fetch, stale_proposals):
+                if error is not None:
+                    error_count += 1
                     self.stdout.write(
-                        self.style.SUCCESS(
-                            f'✓ Updated cache for: {proposal.title} ({proposal.imdb_id})'
+                        self.style.ERROR(
+                            f'✗ Error for {proposal.title} ({proposal.imdb_id}): {str(error)}'
                         )
                     )
-                else:
+                elif imdb_data is None:
                     error_count += 1
                     self.stdout.write(
                         self.style.WARNING(
-                            f'⚠ Failed to fetch data for {proposal.title} (HTTP {resp.status_code})'
+                            f'⚠ Failed to fetch data for {proposal.title} ({proposal.imdb_id})'
                         )
                     )
-                    
-            except Exception as e:
-                error_count += 1
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'✗ Error for {proposal.title} ({proposal.imdb_id}): {str(e)}'
-                    )
-                )
-        
+                else:
+                    proposal.cached_imdb_data = imdb_data
+                    proposal.cached_at = timezone.now()
+                    updated.append(proposal)
+
+        elapsed = time.monotonic() - started
+
+        # One batched write for the whole run
+        if updated:
+            MovieProposal.objects.bulk_update(updated, ['cached_imdb_data', 'cached_at'], batch_size=500)
+            bump_version('proposals')
+
+        throughput = len(stale_proposals) / elapsed if elapsed > 0 else 0
         self.stdout.write(
             self.style.SUCCESS(
-                f'\n✓ Cache refresh complete: {updated_count} updated, {error_count} errors'
+                f'\n✓ Cache refresh complete: {len(updated)} updated, {error_count} errors\n'
+                f'  Fetched {len(stale_proposals)} titles in {elapsed:.2f}s '
+                f'({throughput:.1f} titles/sec, concurrency {concurrency})'
             )
         )
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:39
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_counts(apps, schema_editor):
+    MovieProposal = apps.get_model('home', 'MovieProposal')
+    ProposalVote = apps.get_model('home', 'ProposalVote')
+    votes = ProposalVote.objects.filter(
+        proposal=models.OuterRef('pk')
+    ).order_by().values('proposal').annotate(c=models.Count('pk')).values('c')
+    MovieProposal.objects.update(
+        vote_count=Coalesce(models.Subquery(votes, output_field=models.IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0008_alter_media_options_media_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movieproposal',
+            name='vote_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='movieproposal',
+            index=models.Index(fields=['vote_count', 'created_at'], name='home_moviep_vote_co_cc0b38_idx'),
+        ),
+        migrations.RunPython(backfill_vote_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+def build_summaries(apps, schema_editor):
+    MovieRating = apps.get_model('home', 'MovieRating')
+    MovieRatingSummary = apps.get_model('home', 'MovieRatingSummary')
+    rows = MovieRating.objects.order_by().values('movie_title').annotate(
+        rating_sum=models.Sum('rating'),
+        rating_count=models.Count('pk'),
+        **{f'count_{r}': models.Count('pk', filter=models.Q(rating=r)) for r in range(1, 6)},
+    )
+    MovieRatingSummary.objects.bulk_create([MovieRatingSummary(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0009_movieproposal_vote_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieRatingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movie_title', models.CharField(max_length=255, unique=True)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('count_1', models.IntegerField(default=0)),
+                ('count_2', models.IntegerField(default=0)),
+                ('count_3', models.IntegerField(default=0)),
+                ('count_4', models.IntegerField(default=0)),
+                ('count_5', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.27 on 2026-10-18 17:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0010_movieratingsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movierating',
+            name='media',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='user_ratings', to='home.media'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='movierating',
+            unique_together={('media', 'user')},
+        ),
+        # Summaries are derived data: recreate them keyed by media instead of title
+        migrations.DeleteModel(
+            name='MovieRatingSummary',
+        ),
+        migrations.CreateModel(
+            name='MovieRatingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('count_1', models.IntegerField(default=0)),
+                ('count_2', models.IntegerField(default=0)),
+                ('count_3', models.IntegerField(default=0)),
+                ('count_4', models.IntegerField(default=0)),
+                ('count_5', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('media', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_summary', to='home.media')),
+            ],
+        ),
+    ]
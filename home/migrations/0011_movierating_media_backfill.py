@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+def link_ratings_to_media(apps, schema_editor):
+    """Resolve MovieRating.movie_title to Media (case-insensitive); leave duplicates unlinked."""
+    Media = apps.get_model('home', 'Media')
+    MovieRating = apps.get_model('home', 'MovieRating')
+
+    media_by_title = {}
+    for media_id, title in Media.objects.order_by('-watched', 'number').values_list('id', 'title'):
+        media_by_title.setdefault(title.strip().casefold(), media_id)
+
+    taken = set()
+    for rating in MovieRating.objects.order_by('-updated_at'):
+        media_id = media_by_title.get(rating.movie_title.strip().casefold())
+        if media_id is None or (media_id, rating.user_id) in taken:
+            continue
+        MovieRating.objects.filter(pk=rating.pk).update(media_id=media_id)
+        taken.add((media_id, rating.user_id))
+
+
+def build_summaries(apps, schema_editor):
+    MovieRating = apps.get_model('home', 'MovieRating')
+    MovieRatingSummary = apps.get_model('home', 'MovieRatingSummary')
+    rows = MovieRating.objects.filter(media__isnull=False).order_by().values('media_id').annotate(
+        rating_sum=models.Sum('rating'),
+        rating_count=models.Count('pk'),
+        **{f'count_{r}': models.Count('pk', filter=models.Q(rating=r)) for r in range(1, 6)},
+    )
+    MovieRatingSummary.objects.bulk_create([MovieRatingSummary(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    # Kept apart from 0011: on PostgreSQL the FK updates queue deferred trigger
+    # events, and ALTER TABLE on home_movierating in the same transaction fails
+
+    dependencies = [
+        ('home', '0011_movierating_media'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_ratings_to_media, migrations.RunPython.noop),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
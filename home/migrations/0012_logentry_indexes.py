@@ -0,0 +1,25 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0011_movierating_media_backfill'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['timestamp'], name='home_logent_timesta_8ff7e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['action', 'timestamp'], name='home_logent_action_d6da5e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['user', 'timestamp'], name='home_logent_user_id_af1e34_idx'),
+        ),
+    ]
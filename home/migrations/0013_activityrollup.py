@@ -0,0 +1,39 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('home', '0012_logentry_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_log_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('action', models.CharField(choices=[('vote_add', 'Dodano głos'), ('vote_remove', 'Usunięto głos'), ('proposal_create', 'Nowa propozycja'), ('proposal_delete', 'Usunięto propozycję'), ('movie_mark_watched', 'Oznaczono jako obejrzane'), ('login', 'Logowanie'), ('register', 'Rejestracja'), ('logout', 'Wylogowanie'), ('clear_logs', 'Wyczyszczono logi'), ('password_changed', 'Zmieniono hasło')], max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date', 'action'],
+                'indexes': [models.Index(fields=['date', 'action'], name='home_activi_date_a39b53_idx'), models.Index(fields=['user', 'date'], name='home_activi_user_id_ba2218_idx')],
+            },
+        ),
+    ]
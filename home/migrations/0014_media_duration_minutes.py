@@ -0,0 +1,44 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:56
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of home.utils.parse_duration, so later edits cannot change this migration
+DURATION_RE = re.compile(r'\s*(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?', re.IGNORECASE)
+
+
+def parse_duration(duration):
+    match = DURATION_RE.match(duration or '')
+    if not match:
+        return 0
+    return int(match.group(1) or 0) * 60 + int(match.group(2) or 0)
+
+
+def backfill_duration_minutes(apps, schema_editor):
+    Media = apps.get_model('home', 'Media')
+    updated = []
+    for media in Media.objects.only('id', 'duration').iterator(chunk_size=2000):
+        media.duration_minutes = parse_duration(media.duration) or None
+        updated.append(media)
+    Media.objects.bulk_update(updated, ['duration_minutes'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0013_activityrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='media',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(fields=['watched', 'skipped', 'duration_minutes'], name='home_media_watched_df44e4_idx'),
+        ),
+        migrations.RunPython(backfill_duration_minutes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.27 on 2026-10-18 16:59
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of home.utils.parse_votes, so later edits cannot change this migration
+VOTES_RE = re.compile(r'^\s*([\d.,\s]*\d)\s*([kKmMbB]?)\s*$')
+VOTES_MULTIPLIERS = {'': 1, 'k': 1_000, 'm': 1_000_000, 'b': 1_000_000_000}
+
+
+def parse_votes(votes):
+    match = VOTES_RE.match(str(votes or ''))
+    if not match:
+        return 0
+    number, suffix = match.groups()
+    number = number.replace(' ', '')
+    if suffix:
+        number = number.replace(',', '.')
+    else:
+        number = number.replace(',', '').replace('.', '')
+    try:
+        return int(round(float(number) * VOTES_MULTIPLIERS[suffix.lower()]))
+    except ValueError:
+        return 0
+
+
+def backfill_votes_count(apps, schema_editor):
+    Media = apps.get_model('home', 'Media')
+    updated = []
+    for media in Media.objects.only('id', 'votes').iterator(chunk_size=2000):
+        media.votes_count = parse_votes(media.votes)
+        updated.append(media)
+    Media.objects.bulk_update(updated, ['votes_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0014_media_duration_minutes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='media',
+            name='votes_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(fields=['watched', 'votes_count', 'number'], name='home_media_watched_17caa8_idx'),
+        ),
+        migrations.RunPython(backfill_votes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+# Frozen copy of the DDL in home/search.py, so later edits cannot change this migration.
+# SQLite: FTS5 table + sync triggers; PostgreSQL: GIN tsvector index;
+# other backends: nothing (search falls back to icontains)
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS home_media_fts USING fts5("
+    "title, description, content='home_media', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    """
+    CREATE TRIGGER IF NOT EXISTS home_media_fts_ai AFTER INSERT ON home_media BEGIN
+        INSERT INTO home_media_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS home_media_fts_ad AFTER DELETE ON home_media BEGIN
+        INSERT INTO home_media_fts(home_media_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS home_media_fts_au AFTER UPDATE OF title, description ON home_media BEGIN
+        INSERT INTO home_media_fts(home_media_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO home_media_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO home_media_fts(home_media_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS home_media_fts_ai",
+    "DROP TRIGGER IF EXISTS home_media_fts_ad",
+    "DROP TRIGGER IF EXISTS home_media_fts_au",
+    "DROP TABLE IF EXISTS home_media_fts",
+]
+PG_CREATE = [
+    "CREATE INDEX IF NOT EXISTS home_media_search_idx ON home_media USING GIN (("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')))",
+]
+PG_DROP = ["DROP INDEX IF EXISTS home_media_search_idx"]
+
+
+def _run(schema_editor, statements):
+    statements = statements.get(schema_editor.connection.vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_CREATE, 'postgresql': PG_CREATE})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': PG_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0015_media_votes_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,60 @@
+import unicodedata
+
+from django.db import migrations
+
+# Frozen copy of home.utils.normalize_title, so later edits cannot change this migration
+TITLE_FOLD = str.maketrans({
+    'ł': 'l', 'Ł': 'l', 'đ': 'd', 'Đ': 'd', 'ø': 'o', 'Ø': 'o',
+    'æ': 'ae', 'Æ': 'ae', 'œ': 'oe', 'Œ': 'oe', 'ı': 'i', 'þ': 'th', 'Þ': 'th',
+})
+
+
+def normalize_title(title):
+    decomposed = unicodedata.normalize('NFKD', (title or '').translate(TITLE_FOLD))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+
+def populate_title_keys(apps, schema_editor):
+    """
+    Fill title_key. Proposals whose titles only differ by case/accents/spacing
+    would break the unique constraint added in 0019; they are not merged here
+    (that would move and delete other users' votes as a side effect of
+    migrate) but listed, and the migration stops until they are resolved.
+    """
+    Media = apps.get_model('home', 'Media')
+    MovieProposal = apps.get_model('home', 'MovieProposal')
+
+    media = list(Media.objects.only('id', 'title'))
+    for m in media:
+        m.title_key = normalize_title(m.title)
+    Media.objects.bulk_update(media, ['title_key'], batch_size=500)
+
+    proposals = list(MovieProposal.objects.order_by('created_at', 'id').only('id', 'title'))
+    groups = {}
+    for proposal in proposals:
+        proposal.title_key = normalize_title(proposal.title)
+        groups.setdefault(proposal.title_key, []).append(proposal)
+    duplicates = [group for group in groups.values() if len(group) > 1]
+    if duplicates:
+        listing = '\n'.join(
+            '  ' + ', '.join(f'{p.pk}. "{p.title}"' for p in group) for group in duplicates
+        )
+        raise RuntimeError(
+            f'{len(duplicates)} group(s) of movie proposals differ only by case, accents or spacing:\n'
+            f'{listing}\n'
+            'Rename or merge them (python manage.py merge_duplicate_proposals keeps the oldest '
+            'of each group and moves the votes onto it), then run migrate again.'
+        )
+    MovieProposal.objects.bulk_update(proposals, ['title_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0017_title_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_title_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0018_populate_title_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movieproposal',
+            name='title_key',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0020_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='activityrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'action', 'user'), name='activityrollup_date_action_user_uniq'),
+        ),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.contrib.auth.models import User
 
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from .utils import normalize_title, parse_duration, parse_votes
+
+
 class LogEntry(models.Model):
     ACTION_CHOICES = [
     ('vote_add', 'Dodano głos'),
@@ -27,19 +31,194 @@ class LogEntry(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp']),
+            models.Index(fields=['action', 'timestamp']),
+            models.Index(fields=['user', 'timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.get_action_display()} - {self.timestamp} - {self.user or 'Anonim'}"
 
+    ARCHIVE_FIELDS = ('id', 'timestamp', 'user_id', 'user__username', 'action',
+                      'proposal_id', 'proposal_title', 'details')
+
+    @classmethod
+    def purge(cls, before=None, batch_size=5000, archive=None):
+        """
+        Delete entries (only those older than ``before`` if given) in primary-key chunks.
+
+        Each chunk is deleted in its own short transaction, so no lock is held
+        for the whole table. If ``archive`` (a text file) is given, every row
+        is written to it as a JSON line before it is deleted. Returns the
+        number of entries deleted.
+        """
+        import json
+
+        queryset = cls.objects.order_by('pk')
+        if before is not None:
+            queryset = queryset.filter(timestamp__lt=before)
+
+        deleted = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                chunk = queryset.filter(pk__gt=last_pk)
+                if archive is not None:
+                    rows = list(chunk.values(*cls.ARCHIVE_FIELDS)[:batch_size])
+                    pks = [row['id'] for row in rows]
+                    for row in rows:
+                        archive.write(json.dumps(row, default=str, ensure_ascii=False) + '\n')
+                else:
+                    pks = list(chunk.values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    return deleted
+                cls.objects.filter(pk__in=pks).delete()
+            deleted += len(pks)
+            last_pk = pks[-1]
+
+
+
+class ActivityRollup(models.Model):
+    """Daily LogEntry counts per (action, user), maintained by the rollup_activity command."""
+    date = models.DateField()
+    action = models.CharField(max_length=50, choices=LogEntry.ACTION_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='activity_rollups')
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-date', 'action']
+        indexes = [
+            models.Index(fields=['date', 'action']),
+            models.Index(fields=['user', 'date']),
+        ]
+        constraints = [
+            # NULL users never conflict, so anonymous rows are matched by update_from_logs itself
+            models.UniqueConstraint(fields=['date', 'action', 'user'], name='activityrollup_date_action_user_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.action} {self.user_id or 'Anonim'}: {self.count}"
+    
+    # Extra wait on top of AUDIT_LOG_FLUSH_INTERVAL before a log entry counts as settled
+    SETTLE_MARGIN_SECONDS = 60
+    
+    @classmethod
+    def update_from_logs(cls, batch_size=50000, settle_seconds=None):
+        """
+        Fold LogEntry rows newer than the stored high-water mark into the rollup.
+        
+        Entries are read in id order, ``batch_size`` at a time, each batch
+        aggregated in the database and merged in one transaction together
+        with the new high-water mark. Returns the number of entries processed.
+        
+        Ids are not committed in order (the buffered audit writer inserts in
+        its own transaction while other processes insert directly), so a
+        lower id can appear after a higher one. Only entries older than
+        ``settle_seconds`` (default: AUDIT_LOG_FLUSH_INTERVAL plus a margin)
+        are folded, and the mark stops just before the first unsettled id.
+        """
+        from datetime import timedelta
+        from django.conf import settings
+        from django.db.models.functions import TruncDate
+        
+        if settle_seconds is None:
+            settle_seconds = getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 2.0) + cls.SETTLE_MARGIN_SECONDS
+        
+        processed = 0
+        while True:
+            with transaction.atomic():
+                cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+                state, _ = ActivityRollupState.objects.select_for_update().get_or_create(name='activity')
+                newer = LogEntry.objects.filter(pk__gt=state.last_log_id).order_by('pk').values_list('pk', flat=True)
+                upper = newer[batch_size - 1:batch_size].first() or LogEntry.objects.order_by('-pk').values_list('pk', flat=True).first()
+                unsettled = newer.filter(timestamp__gte=cutoff).first()
+                if unsettled is not None and upper is not None:
+                    upper = min(upper, unsettled - 1)
+                if upper is None or upper <= state.last_log_id:
+                    return processed
+                
+                groups = (
+                    LogEntry.objects.filter(pk__gt=state.last_log_id, pk__lte=upper)
+                    .order_by()
+                    .values(day=TruncDate('timestamp'), action_name=models.F('action'), user_ref=models.F('user_id'))
+                    .annotate(n=models.Count('pk'))
+                )
+                counts = {(g['day'], g['action_name'], g['user_ref']): g['n'] for g in groups}
+                cls._add_counts(counts)
+                
+                processed += sum(counts.values())
+                state.last_log_id = upper
+                state.save(update_fields=['last_log_id', 'updated_at'])
+    
+    @classmethod
+    def _add_counts(cls, counts):
+        """
+        Add ``{(date, action, user_id): n}`` to the rollup.
+        
+        Rows with a user are upserted with INSERT ... ON CONFLICT DO UPDATE
+        against the (date, action, user) constraint. Anonymous rows cannot
+        conflict on NULL, so they are updated first and inserted only when
+        missing; callers hold the ActivityRollupState lock, which keeps that
+        step from racing.
+        """
+        qn = connection.ops.quote_name
+        table = qn(cls._meta.db_table)
+        date, action, user_id, count = (qn(column) for column in ('date', 'action', 'user_id', 'count'))
+        insert = f'INSERT INTO {table} ({date}, {action}, {user_id}, {count}) VALUES (%s, %s, %s, %s)'
+        
+        with connection.cursor() as cursor:
+            upserts = []
+            for (day, action_name, user_ref), n in counts.items():
+                day = connection.ops.adapt_datefield_value(day)
+                if user_ref is not None:
+                    upserts.append([day, action_name, user_ref, n])
+                    continue
+                cursor.execute(
+                    f'UPDATE {table} SET {count} = {count} + %s '
+                    f'WHERE {date} = %s AND {action} = %s AND {user_id} IS NULL',
+                    [n, day, action_name],
+                )
+                if not cursor.rowcount:
+                    cursor.execute(insert, [day, action_name, None, n])
+            if upserts:
+                cursor.executemany(
+                    f'{insert} ON CONFLICT ({date}, {action}, {user_id}) '
+                    f'DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}',
+                    upserts,
+                )
+
+
+class ActivityRollupState(models.Model):
+    """High-water mark (last LogEntry id folded in) for ActivityRollup."""
+    name = models.CharField(max_length=50, unique=True)
+    last_log_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name}: {self.last_log_id}"
+
+
+class DataVersion(models.Model):
+    """Per-domain data version shared by all processes (see home/data_versions.py)."""
+    domain = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.domain}: {self.value}"
+
 
 class Media(models.Model):
     number = models.IntegerField(unique=True, db_index=True)  # Represents the serial number (indexed)
     title = models.CharField(max_length=255, db_index=True)
+    title_key = models.CharField(max_length=255, db_index=True, default='', editable=False)  # normalize_title(title)
     year = models.IntegerField()
     duration = models.CharField(max_length=50)  # e.g., "2h 22m"
+    duration_minutes = models.PositiveIntegerField(null=True, blank=True)  # Parsed from duration on save
     age_rating = models.CharField(max_length=50)
     rating = models.FloatField()
     votes = models.CharField(max_length=50)  # e.g., "3M" from CSV
+    votes_count = models.IntegerField(default=0)  # Parsed from votes on save (0 if unknown)
     metascore = models.IntegerField(null=True, blank=True)  # Some values could be missing
     description = models.TextField()
     watched = models.BooleanField(default=False, db_index=True)
@@ -54,14 +233,77 @@ class Media(models.Model):
         indexes = [
             models.Index(fields=['watched', 'number']),
             models.Index(fields=['title', 'year']),
+            models.Index(fields=['watched', 'skipped', 'duration_minutes']),
+            models.Index(fields=['watched', 'votes_count', 'number']),
         ]
     
     def __str__(self):
         return f"{self.number}. {self.title} ({self.year})"
+    
+    # Source field -> column derived from it (normalized title key, parsed minutes and vote count)
+    DERIVED_FIELDS = {'title': 'title_key', 'duration': 'duration_minutes', 'votes': 'votes_count'}
+    
+    def refresh_derived_fields(self):
+        """Recompute the derived columns from their source fields (also for bulk_create/bulk_update)."""
+        self.title_key = normalize_title(self.title)
+        self.duration_minutes = parse_duration(self.duration) or None  # None if unparseable
+        self.votes_count = parse_votes(self.votes)
+    
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields,
+                *(derived for source, derived in self.DERIVED_FIELDS.items() if source in update_fields),
+            }
+        super().save(*args, **kwargs)
+
+    # Status flags that can be flipped from the list views
+    STATUS_FIELDS = ('watched', 'skipped')
+
+    @classmethod
+    def toggle_status(cls, number, field):
+        """
+        Flip ``field`` (watched/skipped) of the movie ``number`` with a single
+        ``UPDATE ... SET field = NOT field ... RETURNING field``, so concurrent
+        toggles never lose an update.
+
+        Sends no signals: callers bump the 'media' data version.
+        Returns the new value, or None if there is no such movie.
+        """
+        if field not in cls.STATUS_FIELDS:
+            raise ValueError(f'Unknown status field: {field}')
+        qn = connection.ops.quote_name
+        column = qn(field)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {qn(cls._meta.db_table)} SET {column} = NOT {column}, {qn("updated_at")} = %s '
+                f'WHERE {qn("number")} = %s RETURNING {column}',
+                [connection.ops.adapt_datetimefield_value(timezone.now()), number],
+            )
+            row = cursor.fetchone()
+        return None if row is None else bool(row[0])
+
+    @classmethod
+    def set_status(cls, numbers, field, value):
+        """
+        Set ``field`` (watched/skipped) to ``value`` for all movies in ``numbers``
+        in one UPDATE; rows already in that state are left untouched.
+
+        Sends no signals: callers bump the 'media' data version.
+        Returns the number of movies changed.
+        """
+        if field not in cls.STATUS_FIELDS:
+            raise ValueError(f'Unknown status field: {field}')
+        return cls.objects.filter(number__in=numbers).exclude(**{field: value}).update(
+            **{field: value, 'updated_at': timezone.now()}
+        )
 
 
 class MovieProposal(models.Model):
     title = models.CharField(max_length=255)
+    title_key = models.CharField(max_length=255, unique=True, editable=False)  # normalize_title(title)
     imdb_id = models.CharField(max_length=20, blank=True, null=True)
     proposer = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -70,11 +312,36 @@ class MovieProposal(models.Model):
     cached_imdb_data = models.JSONField(null=True, blank=True)
     cached_at = models.DateTimeField(null=True, blank=True)
     
+    # Denormalized number of ProposalVote rows, kept in sync by vote_proposal
+    vote_count = models.IntegerField(default=0)
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['vote_count', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.title} (proposed by {self.proposer.username})"
+    
+    def save(self, *args, **kwargs):
+        self.title_key = normalize_title(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'title_key'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def recount_votes(cls, queryset=None):
+        """Recompute vote_count from ProposalVote in a single UPDATE. Returns rows updated."""
+        votes = ProposalVote.objects.filter(
+            proposal=models.OuterRef('pk')
+        ).order_by().values('proposal').annotate(c=models.Count('pk')).values('c')
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.update(
+            vote_count=Coalesce(models.Subquery(votes, output_field=models.IntegerField()), 0)
+        )
 
 
 class ProposalVote(models.Model):
@@ -87,21 +354,151 @@ class ProposalVote(models.Model):
     
     def __str__(self):
         return f"{self.voter.username} voted for {self.proposal.title}"
+    
+    @classmethod
+    def toggle(cls, proposal_id, voter, state=None):
+        """
+        Add or remove ``voter``'s vote and adjust the proposal's vote_count in one transaction.
+        
+        ``state=None`` toggles; ``True``/``False`` make sure the vote is present/absent,
+        so retries are idempotent. Uses DELETE and INSERT ... ON CONFLICT DO NOTHING
+        row counts instead of a read-then-write, and UPDATE ... RETURNING for the new
+        count (SQLite >= 3.35 / PostgreSQL).
+        
+        Returns ``(voted, vote_count, title, changed)``.
+        Raises ``MovieProposal.DoesNotExist`` if the proposal is gone.
+        """
+        qn = connection.ops.quote_name
+        vote_table = qn(cls._meta.db_table)
+        proposal_table = qn(MovieProposal._meta.db_table)
+        
+        with transaction.atomic(), connection.cursor() as cursor:
+            delta = 0
+            voted = state
+            if state is not True:
+                cursor.execute(
+                    f'DELETE FROM {vote_table} WHERE proposal_id = %s AND voter_id = %s',
+                    [proposal_id, voter.pk],
+                )
+                if cursor.rowcount:
+                    delta, voted = -1, False
+                elif state is None:
+                    voted = True
+            if voted and delta == 0:
+                cursor.execute(
+                    f'INSERT INTO {vote_table} (proposal_id, voter_id, created_at) VALUES (%s, %s, %s) '
+                    f'ON CONFLICT (proposal_id, voter_id) DO NOTHING',
+                    [proposal_id, voter.pk, connection.ops.adapt_datetimefield_value(timezone.now())],
+                )
+                delta = cursor.rowcount
+            cursor.execute(
+                f'UPDATE {proposal_table} SET vote_count = vote_count + %s WHERE id = %s '
+                f'RETURNING vote_count, title',
+                [delta, proposal_id],
+            )
+            row = cursor.fetchone()
+            if row is None:
+                # Rolls back the vote change as well
+                raise MovieProposal.DoesNotExist(f'MovieProposal {proposal_id} does not exist.')
+        
+        return bool(voted), row[0], row[1], delta != 0
 
 
 class MovieRating(models.Model):
-    movie_title = models.CharField(max_length=255)  # Movie title from CSV
+    # Deleting a Media detaches its ratings; import_csv_to_db and restore_backup re-link them by title
+    media = models.ForeignKey(Media, on_delete=models.SET_NULL, null=True, blank=True, related_name='user_ratings')
+    movie_title = models.CharField(max_length=255)  # Title label at rating time; lookups use media
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='movie_ratings')
     rating = models.IntegerField(choices=[(1, '1'), (2, '2'), (3, '3'), (4, '4'), (5, '5')])
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        unique_together = ('movie_title', 'user')  # One rating per user per movie
+        unique_together = ('media', 'user')  # One rating per user per movie
         ordering = ['-created_at']
     
     def __str__(self):
         return f"{self.user.username} rated '{self.movie_title}' {self.rating}/5"
+    
+    @classmethod
+    def link_unresolved(cls):
+        """Attach ratings without a media (e.g. after a Media re-import) by normalized title."""
+        media_by_title = {}
+        for media_id, title_key in Media.objects.order_by('-watched', 'number').values_list('id', 'title_key'):
+            media_by_title.setdefault(title_key, media_id)
+        
+        linked = 0
+        unresolved = cls.objects.filter(media__isnull=True).order_by('-updated_at')
+        taken = set(cls.objects.filter(media__isnull=False).values_list('media_id', 'user_id'))
+        for rating in unresolved:
+            media_id = media_by_title.get(normalize_title(rating.movie_title))
+            if media_id is None or (media_id, rating.user_id) in taken:
+                continue
+            cls.objects.filter(pk=rating.pk).update(media_id=media_id)
+            taken.add((media_id, rating.user_id))
+            linked += 1
+        return linked
+
+
+class MovieRatingSummary(models.Model):
+    """Running rating totals per movie, kept in sync with MovieRating by the rating views."""
+    media = models.OneToOneField(Media, on_delete=models.CASCADE, related_name='rating_summary')
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    # Histogram of ratings 1-5
+    count_1 = models.IntegerField(default=0)
+    count_2 = models.IntegerField(default=0)
+    count_3 = models.IntegerField(default=0)
+    count_4 = models.IntegerField(default=0)
+    count_5 = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.media_id}: {self.average_rating:.2f} ({self.rating_count})"
+    
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else 0
+    
+    @property
+    def histogram(self):
+        return {r: getattr(self, f'count_{r}') for r in range(1, 6)}
+    
+    @classmethod
+    def record(cls, media_id, added=None, removed=None):
+        """
+        Apply one rating change (new rating ``added``, previous rating ``removed``).
+        
+        Must run inside the transaction that changes the MovieRating row.
+        """
+        if added == removed:
+            return
+        buckets = {}
+        if removed:
+            buckets[removed] = buckets.get(removed, 0) - 1
+        if added:
+            buckets[added] = buckets.get(added, 0) + 1
+        
+        cls.objects.get_or_create(media_id=media_id)
+        cls.objects.filter(media_id=media_id).update(
+            rating_sum=models.F('rating_sum') + (added or 0) - (removed or 0),
+            rating_count=models.F('rating_count') + (1 if added else 0) - (1 if removed else 0),
+            updated_at=timezone.now(),
+            **{f'count_{r}': models.F(f'count_{r}') + delta for r, delta in buckets.items()},
+        )
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute all summaries from MovieRating. Returns the number of movies summarized."""
+        rows = MovieRating.objects.filter(media__isnull=False).order_by().values('media_id').annotate(
+            rating_sum=models.Sum('rating'),
+            rating_count=models.Count('pk'),
+            **{f'count_{r}': models.Count('pk', filter=models.Q(rating=r)) for r in range(1, 6)},
+        )
+        summaries = [cls(**row) for row in rows]
+        cls.objects.all().delete()
+        cls.objects.bulk_create(summaries, batch_size=500)
+        return len(summaries)
 
 
 class UserProposalLimit(models.Model):
@@ -0,0 +1,125 @@
+"""
+Movie-night planner: pick k films whose total length is closest to a target.
+
+Candidates are grouped by duration (whole minutes), so the search runs over
+the few hundred distinct lengths rather than over every film, and is
+expanded to concrete films only for combinations that make the top N.
+
+    k = 1   bisect into the sorted lengths and walk outwards from the target
+    k = 2   the same walk for the second film, for each first film (two pointers)
+    k >= 3  depth-first over non-decreasing lengths; a branch is cut when its
+            smallest or largest reachable total cannot land within the current
+            tolerance, and the tolerance shrinks to the worst kept deviation
+            once N plans are found (branch and bound)
+"""
+import heapq
+import itertools
+from bisect import bisect_left
+from collections import defaultdict
+
+MAX_FILMS_PER_NIGHT = 4
+
+
+def _expand(lengths, ids_by_length):
+    """Yield tuples of film ids for a non-decreasing tuple of lengths (each film used once)."""
+    # Lazy nested loops: itertools.product would first materialize every
+    # combination, e.g. C(120, 4) for four films of one common length
+    groups = [(ids_by_length[length], len(list(same))) for length, same in itertools.groupby(lengths)]
+
+    def expand(index):
+        if index == len(groups):
+            yield ()
+            return
+        ids, count = groups[index]
+        for part in itertools.combinations(ids, count):
+            for rest in expand(index + 1):
+                yield part + rest
+
+    return expand(0)
+
+
+def plan_nights(movies, target, tolerance, k=2, limit=5):
+    """
+    Return up to ``limit`` plans of ``k`` distinct films whose total length is
+    within ``tolerance`` minutes of ``target``, best first.
+
+    ``movies`` is an iterable of ``(minutes, movie_id)``. Each plan is a
+    ``(total_minutes, movie_ids)`` tuple; ties keep discovery order, which
+    prefers shorter first films.
+    """
+    ids_by_length = defaultdict(list)
+    for minutes, movie_id in movies:
+        if minutes:
+            ids_by_length[minutes].append(movie_id)
+    lengths = sorted(ids_by_length)
+    if k < 1 or limit < 1 or not lengths:
+        return []
+
+    heap = []  # (-deviation, -sequence, total, ids): worst kept plan on top
+    sequence = itertools.count()
+    # done: ``limit`` exact plans are kept; ties never replace them, so stop
+    state = {'tolerance': tolerance, 'done': False}
+
+    def offer(chosen):
+        total = sum(chosen)
+        deviation = abs(total - target)
+        if deviation > state['tolerance']:
+            return
+        for ids in itertools.islice(_expand(chosen, ids_by_length), limit):
+            entry = (-deviation, -next(sequence), total, ids)
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            else:
+                return
+        if len(heap) == limit:
+            state['tolerance'] = min(state['tolerance'], -heap[0][0])
+            state['done'] = state['tolerance'] == 0
+
+    def available(index, chosen):
+        length = lengths[index]
+        return chosen.count(length) < len(ids_by_length[length])
+
+    def last_film(start, chosen):
+        # Walk outwards from the length closest to what is left of the target
+        wanted = target - sum(chosen)
+        right = max(bisect_left(lengths, wanted), start)
+        left = right - 1
+        while not state['done']:
+            tolerance = state['tolerance']
+            left_ok = left >= start and wanted - lengths[left] <= tolerance
+            right_ok = right < len(lengths) and lengths[right] - wanted <= tolerance
+            if not left_ok and not right_ok:
+                return
+            if right_ok and (not left_ok or lengths[right] - wanted <= wanted - lengths[left]):
+                if available(right, chosen):
+                    offer(chosen + (lengths[right],))
+                right += 1
+            else:
+                if available(left, chosen):
+                    offer(chosen + (lengths[left],))
+                left -= 1
+
+    def search(start, remaining, chosen):
+        if remaining == 1:
+            last_film(start, chosen)
+            return
+        so_far = sum(chosen)
+        for index in range(start, len(lengths)):
+            if state['done']:
+                return
+            length = lengths[index]
+            tolerance = state['tolerance']
+            # Lengths only grow from here: the smallest reachable total is too long
+            if so_far + length * remaining > target + tolerance:
+                return
+            # Even the longest films would leave the night too short
+            if so_far + length + lengths[-1] * (remaining - 1) < target - tolerance:
+                continue
+            if not available(index, chosen):
+                continue
+            search(index, remaining - 1, chosen + (length,))
+
+    search(0, k, ())
+    return [(total, ids) for _, _, total, ids in sorted(heap, reverse=True)]
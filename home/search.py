@@ -0,0 +1,156 @@
+"""
+Full-text search over the Media catalog (title and description).
+
+SQLite uses an external-content FTS5 table (``home_media_fts``) kept in sync
+by triggers on ``home_media``, so save(), QuerySet.update() and bulk imports
+are all indexed. PostgreSQL uses a GIN expression index over a weighted
+tsvector. Other backends fall back to an unindexed ``icontains`` scan.
+
+Neither index folds letters the way ``normalize_title`` (TITLE_FOLD) does.
+FTS5's ``unicode61 remove_diacritics 2`` strips combining accents (ó, ź, ż)
+but keeps letters such as ł, and PostgreSQL's 'simple' configuration keeps
+all accents, as does the ``icontains`` fallback (whose case folding is
+ASCII-only on SQLite). So "lodz" does not find "Łódź" although both have
+the title_key "lodz"; "łodz" or "łódź" do.
+
+SQLite drops a table's triggers when Django rebuilds the table during a
+migration, so ``install_search_index`` also runs after every ``migrate``
+(see home/signals.py) and rebuilds the index if anything was missing.
+"""
+import re
+
+from django.db import DatabaseError, connection as default_connection, transaction
+from django.db.models import Q
+
+FTS_TABLE = 'home_media_fts'
+SQLITE_TRIGGERS = {
+    'home_media_fts_ai': """
+        CREATE TRIGGER home_media_fts_ai AFTER INSERT ON home_media BEGIN
+            INSERT INTO home_media_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+    'home_media_fts_ad': """
+        CREATE TRIGGER home_media_fts_ad AFTER DELETE ON home_media BEGIN
+            INSERT INTO home_media_fts(home_media_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    """,
+    'home_media_fts_au': """
+        CREATE TRIGGER home_media_fts_au AFTER UPDATE OF title, description ON home_media BEGIN
+            INSERT INTO home_media_fts(home_media_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO home_media_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+}
+
+# Must match the expression of home_media_search_idx exactly for the index to be used
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+# bm25 column weights (title, description)
+SQLITE_WEIGHTS = (10.0, 1.0)
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def install_search_index(connection=None):
+    """Create the full-text index if it (or a SQLite trigger) is missing. Returns True if anything was created."""
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+                [f'{FTS_TABLE}%'],
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+            if FTS_TABLE in existing and not missing:
+                return False
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "title, description, content='home_media', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            for name in missing:
+                cursor.execute(SQLITE_TRIGGERS[name])
+            # Rows written while the triggers were missing are picked up here
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            return True
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT to_regclass('home_media_search_idx')")
+            if cursor.fetchone()[0]:
+                return False
+            cursor.execute(f"CREATE INDEX home_media_search_idx ON home_media USING GIN (({PG_VECTOR}))")
+            return True
+    return False
+
+
+def drop_search_index(connection=None):
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS home_media_search_idx")
+
+
+def search_terms(query):
+    """Split a user query into word terms (punctuation and FTS operators are dropped)."""
+    return TERM_RE.findall(query or '')[:10]
+
+
+def search_media(query, limit=20, offset=0):
+    """
+    Return ``[(media_id, rank), ...]`` for Media matching every term of ``query``
+    (the last term as a prefix), best match first. Titles weigh more than
+    descriptions. ``rank`` is only comparable within one backend.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    connection = default_connection
+    if connection.vendor == 'sqlite':
+        # "term" AND "term" AND "prefix"*
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        sql = (
+            f"SELECT rowid, bm25({FTS_TABLE}, %s, %s) AS rank FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY rank, rowid DESC LIMIT %s OFFSET %s"
+        )
+        params = [*SQLITE_WEIGHTS, match, limit, offset]
+    elif connection.vendor == 'postgresql':
+        tsquery = ' & '.join(terms[:-1] + [terms[-1] + ':*'])
+        sql = (
+            f"SELECT id, ts_rank({PG_VECTOR}, query) AS rank "
+            f"FROM home_media, to_tsquery('simple', %s) query "
+            f"WHERE ({PG_VECTOR}) @@ query ORDER BY rank DESC, id DESC LIMIT %s OFFSET %s"
+        )
+        params = [tsquery, limit, offset]
+    else:
+        return _search_fallback(terms, limit, offset)
+
+    try:
+        # Savepoint: on PostgreSQL a failed query would abort the caller's transaction
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+    except DatabaseError:
+        # e.g. SQLite built without FTS5 or the index not installed yet
+        return _search_fallback(terms, limit, offset)
+
+
+def _search_fallback(terms, limit, offset):
+    from .models import Media
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(description__icontains=term)
+    ids = Media.objects.filter(condition).order_by('-number').values_list('id', flat=True)[offset:offset + limit]
+    return [(media_id, 0) for media_id in ids]
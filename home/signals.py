@@ -0,0 +1,35 @@
+"""
+Signal handlers keeping the data versions (home/data_versions.py) in step
+with model writes that go through save()/delete().
+
+Bulk writes (QuerySet.update, bulk_create, bulk_update) send no signals, so
+code using them still bumps the version itself.
+
+The search index (home/search.py) is re-checked after every migrate, since
+SQLite table rebuilds drop its sync triggers.
+"""
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .data_versions import bump_version
+from .models import Media
+from .search import install_search_index
+
+SEARCH_INDEX_MIGRATION = ('home', '0016_media_search_index')
+
+
+@receiver(post_save, sender=Media)
+@receiver(post_delete, sender=Media)
+def media_changed(sender, **kwargs):
+    """Invalidate everything derived from Media (recommendations, watched list, ETags)."""
+    bump_version('media')
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """Reinstall missing search triggers/index once the migration that creates them is applied."""
+    connection = connections[using]
+    if SEARCH_INDEX_MIGRATION not in MigrationRecorder(connection).applied_migrations():
+        return
+    install_search_index(connection)
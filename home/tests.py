@@ -1,3 +1,728 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import itertools
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .audit import AuditLogger
+from .data_versions import bump_version
+from .events import Broadcaster, broadcaster, publish
+from .models import ActivityRollup, LogEntry, Media, MovieProposal, MovieRating, MovieRatingSummary, ProposalVote
+from .planner import plan_nights
+from .search import drop_search_index, search_media
+from .utils import normalize_title, parse_duration, parse_votes
+
+
+def make_media(number, **fields):
+    defaults = {'title': f'Film {number}', 'year': 2000, 'rating': 7.0, 'duration': '1h 30m'}
+    defaults.update(fields)
+    return Media.objects.create(number=number, **defaults)
+
+
+# Pages render {% static %}; the manifest storage needs collectstatic first
+plain_static = override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+
+
+class PageTestCase(TestCase):
+    """Renders pages with an empty cache and without scheduling IMDb refreshes."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('home.imdb.refresher.schedule')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class ProposalVoteToggleTests(TestCase):
+    """ProposalVote.toggle runs hand-written SQL; vote_count must always match the vote rows."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='x' * 10)
+        self.bob = User.objects.create_user('bob', password='x' * 10)
+        self.proposal = MovieProposal.objects.create(title='Film', proposer=self.alice)
+
+    def assertCountInSync(self, expected):
+        self.proposal.refresh_from_db()
+        self.assertEqual(self.proposal.vote_count, expected)
+        self.assertEqual(ProposalVote.objects.filter(proposal=self.proposal).count(), expected)
+
+    def test_toggle_on_and_off(self):
+        voted, count, title, changed = ProposalVote.toggle(self.proposal.id, self.alice)
+        self.assertEqual((voted, count, title, changed), (True, 1, 'Film', True))
+        self.assertCountInSync(1)
+
+        voted, count, _, changed = ProposalVote.toggle(self.proposal.id, self.alice)
+        self.assertEqual((voted, count, changed), (False, 0, True))
+        self.assertCountInSync(0)
+
+    def test_explicit_state_is_idempotent(self):
+        self.assertEqual(ProposalVote.toggle(self.proposal.id, self.alice, True)[::3], (True, True))
+        voted, count, _, changed = ProposalVote.toggle(self.proposal.id, self.alice, True)
+        self.assertEqual((voted, count, changed), (True, 1, False))
+        self.assertCountInSync(1)
+
+        self.assertEqual(ProposalVote.toggle(self.proposal.id, self.alice, False)[::3], (False, True))
+        voted, count, _, changed = ProposalVote.toggle(self.proposal.id, self.alice, False)
+        self.assertEqual((voted, count, changed), (False, 0, False))
+        self.assertCountInSync(0)
+
+    def test_count_follows_several_voters(self):
+        ProposalVote.toggle(self.proposal.id, self.alice)
+        ProposalVote.toggle(self.proposal.id, self.bob)
+        self.assertCountInSync(2)
+        ProposalVote.toggle(self.proposal.id, self.alice)
+        self.assertCountInSync(1)
+        # A full recount finds nothing to fix
+        MovieProposal.recount_votes()
+        self.assertCountInSync(1)
+
+    def test_missing_proposal_rolls_back(self):
+        with self.assertRaises(MovieProposal.DoesNotExist):
+            ProposalVote.toggle(99999, self.alice)
+        self.assertFalse(ProposalVote.objects.filter(proposal_id=99999).exists())
+
+    def test_vote_endpoint_state_on_is_idempotent(self):
+        self.client.force_login(self.alice)
+        url = f'/vote/{self.proposal.id}/?state=on'
+        for _ in range(2):
+            data = self.client.post(url).json()
+            self.assertEqual((data['status'], data['voted'], data['vote_count']), ('success', True, 1))
+        self.assertCountInSync(1)
+
+        data = self.client.post(f'/vote/{self.proposal.id}/?state=off').json()
+        self.assertEqual((data['voted'], data['vote_count']), (False, 0))
+        self.assertCountInSync(0)
+
+        data = self.client.post(f'/vote/{self.proposal.id}/?state=maybe').json()
+        self.assertEqual(data['status'], 'error')
+        self.assertCountInSync(0)
+
+
+class MediaStatusTests(TestCase):
+    """Media.toggle_status / set_status bypass save() with single UPDATE statements."""
+
+    def test_toggle_status(self):
+        make_media(1)
+        self.assertIs(Media.toggle_status(1, 'watched'), True)
+        self.assertTrue(Media.objects.get(number=1).watched)
+        self.assertIs(Media.toggle_status(1, 'watched'), False)
+        self.assertIs(Media.toggle_status(1, 'skipped'), True)
+        media = Media.objects.get(number=1)
+        self.assertEqual((media.watched, media.skipped), (False, True))
+
+    def test_toggle_status_missing_movie(self):
+        self.assertIsNone(Media.toggle_status(404, 'watched'))
+
+    def test_set_status_counts_changed_rows_only(self):
+        for number in (1, 2, 3):
+            make_media(number)
+        Media.objects.filter(number=2).update(watched=True)
+        self.assertEqual(Media.set_status([1, 2, 3, 404], 'watched', True), 2)
+        self.assertEqual(Media.objects.filter(watched=True).count(), 3)
+        self.assertEqual(Media.set_status([1, 2], 'watched', False), 2)
+        self.assertEqual(list(Media.objects.filter(watched=True).values_list('number', flat=True)), [3])
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Media.toggle_status(1, 'title')
+        with self.assertRaises(ValueError):
+            Media.set_status([1], 'series', True)
+
+
+class ParsingTests(TestCase):
+
+    def test_parse_duration(self):
+        cases = {
+            '2h 22m': 142, '1h': 60, '95m': 95, ' 1 h 5 m ': 65, '2H 5M': 125,
+            '': 0, None: 0, 'N/A': 0,
+        }
+        for value, minutes in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(parse_duration(value), minutes)
+
+    def test_parse_votes(self):
+        cases = {
+            '3M': 3_000_000, '850K': 850_000, '1.2M': 1_200_000, '1,2M': 1_200_000,
+            '12,345': 12_345, '12.345': 12_345, '1 234': 1_234, '999': 999, 2_000: 2_000,
+            '': 0, None: 0, 'N/A': 0, 'M': 0,
+        }
+        for value, count in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(parse_votes(value), count)
+
+    def test_normalize_title(self):
+        self.assertEqual(normalize_title('  Ojciec   Chrzestny '), 'ojciec chrzestny')
+        self.assertEqual(normalize_title('Żółć'), normalize_title('zolc'))
+        self.assertEqual(normalize_title('Łódź'), 'lodz')
+        self.assertEqual(normalize_title(None), '')
+
+    def test_save_fills_derived_fields(self):
+        media = make_media(1, title='Łódź', duration='2h 5m', votes='1.5K')
+        self.assertEqual((media.title_key, media.duration_minutes, media.votes_count), ('lodz', 125, 1500))
+        media.duration = 'unknown'
+        media.save(update_fields=['duration'])
+        media.refresh_from_db()
+        self.assertIsNone(media.duration_minutes)
+
+
+class PlanNightsTests(TestCase):
+
+    def brute_force(self, movies, target, tolerance, k):
+        """Every combination within tolerance, as sorted (deviation, total) pairs."""
+        plans = []
+        for combo in itertools.combinations(movies, k):
+            total = sum(minutes for minutes, _ in combo)
+            if abs(total - target) <= tolerance:
+                plans.append((abs(total - target), total))
+        return sorted(plans)
+
+    def test_single_film_closest_first(self):
+        movies = [(90, 'a'), (100, 'b'), (112, 'c'), (130, 'd')]
+        self.assertEqual(plan_nights(movies, 105, 10, k=1, limit=5), [(100, ('b',)), (112, ('c',))])
+        self.assertEqual(plan_nights(movies, 105, 10, k=1, limit=1), [(100, ('b',))])
+
+    def test_pair_uses_each_film_once(self):
+        movies = [(120, 'a'), (150, 'b')]
+        plans = plan_nights(movies, 240, 0, k=2, limit=5)
+        self.assertEqual(plans, [])
+        movies.append((120, 'c'))
+        self.assertEqual(plan_nights(movies, 240, 0, k=2, limit=5), [(240, ('a', 'c'))])
+
+    def test_skips_unknown_durations_and_bad_arguments(self):
+        movies = [(None, 'a'), (0, 'b'), (100, 'c')]
+        self.assertEqual(plan_nights(movies, 100, 0, k=1), [(100, ('c',))])
+        self.assertEqual(plan_nights(movies, 100, 0, k=0), [])
+        self.assertEqual(plan_nights([], 100, 10, k=1), [])
+
+    def test_matches_brute_force(self):
+        lengths = [85, 90, 90, 95, 101, 110, 118, 120, 120, 131, 140, 152, 165, 178]
+        movies = [(minutes, index) for index, minutes in enumerate(lengths)]
+        for k, target, tolerance, limit in [(2, 240, 10, 5), (3, 330, 15, 8), (4, 420, 5, 20), (2, 500, 3, 5)]:
+            with self.subTest(k=k, target=target):
+                plans = plan_nights(movies, target, tolerance, k=k, limit=limit)
+                expected = self.brute_force(movies, target, tolerance, k)[:limit]
+                self.assertEqual(
+                    [abs(total - target) for total, _ in plans],
+                    [deviation for deviation, _ in expected],
+                )
+                for total, ids in plans:
+                    self.assertEqual(len(set(ids)), k)
+                    self.assertEqual(sum(lengths[i] for i in ids), total)
+
+    def test_many_films_of_one_length(self):
+        # C(300, 4) combinations of the same four lengths must not be built up front
+        movies = [(90, index) for index in range(300)] + [(120, 300)]
+        plans = plan_nights(movies, 360, 0, k=4, limit=3)
+        self.assertEqual(plans, [(360, (0, 1, 2, 3)), (360, (0, 1, 2, 4)), (360, (0, 1, 2, 5))])
+        self.assertEqual(plan_nights(movies, 390, 0, k=4, limit=1), [(390, (0, 1, 2, 300))])
+
+
+class PlanMovieNightViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for number, duration in enumerate(['1h 30m', '2h', '2h 30m', '1h 45m'], start=1):
+            make_media(number, duration=duration)
+        make_media(5, duration='2h', watched=True)
+
+    def test_plans_unwatched_films(self):
+        data = self.client.get('/plan_movie_night/', {'target': 210, 'tolerance': 0, 'k': 2}).json()
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual(
+            [sorted(movie['id'] for movie in plan['movies']) for plan in data['plans']], [[1, 2]]
+        )
+
+    def test_target_and_tolerance_are_capped(self):
+        data = self.client.get('/plan_movie_night/', {'target': 100000, 'tolerance': 100000, 'k': 4}).json()
+        self.assertEqual((data['target'], data['tolerance']), (720, 720))
+        data = self.client.get('/plan_movie_night/', {'target': 200, 'tolerance': 5000}).json()
+        self.assertEqual((data['target'], data['tolerance']), (200, 200))
+
+    def test_bad_parameters(self):
+        for params in ({'k': 5}, {'target': 0}, {'tolerance': -1}, {'target': 'x'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/plan_movie_night/', params).json()['status'], 'error')
+
+
+class RatingsBatchTests(TestCase):
+
+    def test_aggregates_and_per_user_lists_in_one_ratings_query(self):
+        alice = User.objects.create_user('alice', password='x' * 10)
+        bob = User.objects.create_user('bob', password='x' * 10)
+        first, second, unrated = make_media(1), make_media(2), make_media(3)
+        MovieRating.objects.create(media=first, movie_title=first.title, user=alice, rating=4)
+        MovieRating.objects.create(media=first, movie_title=first.title, user=bob, rating=5)
+        MovieRating.objects.create(media=second, movie_title=second.title, user=bob, rating=2)
+        MovieRatingSummary.rebuild()
+        self.client.force_login(alice)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/get_movie_ratings_batch/', {'media_id': [first.id, second.id, unrated.id]}
+            )
+        rating_queries = [q for q in queries if 'FROM "home_movierating"' in q['sql']]
+        self.assertEqual(len(rating_queries), 1)
+
+        ratings = response.json()['ratings']
+        self.assertEqual(
+            (ratings[str(first.id)]['average_rating'], ratings[str(first.id)]['rating_count']), (4.5, 2)
+        )
+        self.assertEqual(ratings[str(first.id)]['user_rating'], 4)
+        self.assertEqual(
+            sorted((r['user__username'], r['rating']) for r in ratings[str(first.id)]['ratings_by_user']),
+            [('alice', 4), ('bob', 5)],
+        )
+        self.assertIsNone(ratings[str(second.id)]['user_rating'])
+        self.assertEqual(ratings[str(second.id)]['ratings_by_user'], [{'user__username': 'bob', 'rating': 2}])
+        self.assertEqual(
+            (ratings[str(unrated.id)]['rating_count'], ratings[str(unrated.id)]['ratings_by_user']), (0, [])
+        )
+
+
+@override_settings(AUDIT_LOG_ASYNC=True)
+class AuditLoggerTests(TestCase):
+    """A private logger whose writer thread never wakes up on its own during a test."""
+
+    def make_logger(self, **options):
+        return AuditLogger(flush_interval=3600, batch_size=1000, **options)
+
+    def test_entries_are_buffered_until_flush(self):
+        audit = self.make_logger()
+        audit.log(action='login', details='a')
+        audit.log(action='logout', details='b')
+        self.assertFalse(LogEntry.objects.exists())
+
+        self.assertEqual(audit.flush(), 2)
+        self.assertEqual(sorted(LogEntry.objects.values_list('action', flat=True)), ['login', 'logout'])
+        self.assertEqual(audit.flush(), 0)
+
+    def test_full_buffer_writes_synchronously(self):
+        audit = self.make_logger(max_buffer=1)
+        audit.log(action='login', details='buffered')
+        audit.log(action='logout', details='written inline')
+        self.assertEqual(list(LogEntry.objects.values_list('details', flat=True)), ['written inline'])
+
+        self.assertEqual(audit.flush(), 1)
+        self.assertEqual(LogEntry.objects.count(), 2)
+
+    def test_forked_process_drops_inherited_buffer(self):
+        audit = self.make_logger()
+        audit.log(action='login')
+        audit._pid = os.getpid() + 1  # as seen from a freshly forked worker
+        self.assertEqual(audit.flush(), 0)
+        self.assertFalse(LogEntry.objects.exists())
+        self.assertEqual(audit._pid, os.getpid())
+
+    @override_settings(AUDIT_LOG_ASYNC=False)
+    def test_sync_mode_writes_inline(self):
+        self.make_logger().log(action='login')
+        self.assertEqual(LogEntry.objects.count(), 1)
+
+
+class ActivityRollupTests(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='x' * 10)
+        self.old = timezone.now() - timedelta(hours=1)
+
+    def totals(self):
+        return {
+            (row.action, row.user_id): row.count
+            for row in ActivityRollup.objects.all()
+        }
+
+    def test_unsettled_entries_wait_for_the_next_run(self):
+        LogEntry.objects.create(action='vote_add', user=self.alice, timestamp=self.old)
+        recent = LogEntry.objects.create(action='vote_add', user=self.alice)
+        LogEntry.objects.create(action='login', timestamp=self.old)
+
+        # Only the entry before the first unsettled id is folded in
+        self.assertEqual(ActivityRollup.update_from_logs(settle_seconds=60), 1)
+        self.assertEqual(self.totals(), {('vote_add', self.alice.id): 1})
+
+        LogEntry.objects.filter(pk=recent.pk).update(timestamp=self.old)
+        self.assertEqual(ActivityRollup.update_from_logs(settle_seconds=60), 2)
+        expected = {('vote_add', self.alice.id): 2, ('login', None): 1}
+        self.assertEqual(self.totals(), expected)
+
+        # Reruns never count an entry twice
+        self.assertEqual(ActivityRollup.update_from_logs(settle_seconds=60), 0)
+        self.assertEqual(self.totals(), expected)
+
+    def test_batches_add_to_existing_rows(self):
+        for action, user in [('vote_add', self.alice), ('login', None)] * 3:
+            LogEntry.objects.create(action=action, user=user, timestamp=self.old)
+        self.assertEqual(ActivityRollup.update_from_logs(batch_size=2, settle_seconds=60), 6)
+        self.assertEqual(self.totals(), {('vote_add', self.alice.id): 3, ('login', None): 3})
+        self.assertEqual(ActivityRollup.objects.count(), 2)
+
+    def test_one_row_per_day_action_and_user(self):
+        ActivityRollup.objects.create(date=self.old.date(), action='vote_add', user=self.alice, count=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ActivityRollup.objects.create(date=self.old.date(), action='vote_add', user=self.alice, count=1)
+
+
+class VoteEventsTests(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def subscribe(self, target):
+        async def subscribe():
+            return target.subscribe()
+        subscription = self.loop.run_until_complete(subscribe())
+        self.addCleanup(target.unsubscribe, subscription)
+        return subscription[1]
+
+    def receive(self, queue):
+        return self.loop.run_until_complete(asyncio.wait_for(queue.get(), 1))
+
+    def test_published_event_reaches_subscribers_after_commit(self):
+        first, second = self.subscribe(broadcaster), self.subscribe(broadcaster)
+        with self.captureOnCommitCallbacks(execute=True):
+            publish('vote', proposal_id=7, vote_count=3)
+            self.assertTrue(first.empty())
+        for queue in (first, second):
+            _, event, data = self.receive(queue)
+            self.assertEqual((event, data), ('vote', {'proposal_id': 7, 'vote_count': 3}))
+
+    def test_rolled_back_event_is_not_sent(self):
+        queue = self.subscribe(broadcaster)
+        with self.captureOnCommitCallbacks(execute=False):
+            publish('vote', proposal_id=7, vote_count=3)
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertTrue(queue.empty())
+
+    def test_slow_subscriber_drops_events(self):
+        local = Broadcaster(max_queue=1)
+        queue = self.subscribe(local)
+        local.send('vote', {'n': 1})
+        local.send('vote', {'n': 2})
+        self.assertEqual(self.receive(queue)[2], {'n': 1})
+        self.assertTrue(queue.empty())
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.assertEqual(self.client.get('/vote/events/').status_code, 204)
+
+
+@plain_static
+@override_settings(AUDIT_LOG_ASYNC=False)
+class VotePageCacheTests(PageTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user('alice', password='x' * 10)
+        self.bob = User.objects.create_user('bob', password='x' * 10)
+        self.proposal = MovieProposal.objects.create(title='Film', proposer=self.alice)
+        MovieProposal.objects.create(title='Other', proposer=self.bob)
+
+    def shown(self, user):
+        self.client.force_login(user)
+        response = self.client.get('/vote/')
+        return {p['id']: p for p in response.context['proposals']}[self.proposal.id]
+
+    def test_votes_overlay_is_per_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ProposalVote.toggle(self.proposal.id, self.alice)
+            bump_version('votes')
+        first = self.shown(self.alice)
+        self.assertEqual((first['user_voted'], first['is_proposer'], first['vote_count']), (True, True, 1))
+
+        # Served from the shared layer-1 entry alice's request filled
+        with CaptureQueriesContext(connection) as queries:
+            second = self.shown(self.bob)
+        self.assertFalse(any('ORDER BY "home_movieproposal"."vote_count"' in q['sql'] for q in queries))
+        self.assertEqual((second['user_voted'], second['is_proposer'], second['vote_count']), (False, False, 1))
+
+        # alice takes her vote back: bob fills the new entry, alice must not see his view either
+        with self.captureOnCommitCallbacks(execute=True):
+            ProposalVote.toggle(self.proposal.id, self.alice, False)
+            ProposalVote.toggle(self.proposal.id, self.bob, True)
+            bump_version('votes')
+        self.assertEqual((self.shown(self.bob)['user_voted'], self.shown(self.bob)['vote_count']), (True, 1))
+        self.assertEqual((self.shown(self.alice)['user_voted'], self.shown(self.alice)['vote_count']), (False, 1))
+
+
+@plain_static
+class VotePagePaginationTests(PageTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='x' * 10)
+        for i in range(45):
+            MovieProposal.objects.create(title=f'Film {i}', proposer=self.user, vote_count=i % 3)
+        # Ties on both sort keys: only the id separates rows within a group
+        stamp = timezone.now()
+        MovieProposal.objects.filter(pk__in=MovieProposal.objects.order_by('pk').values('pk')[:30]).update(created_at=stamp)
+
+    def test_cursors_visit_every_proposal_once(self):
+        seen, url = [], '/vote/'
+        while url:
+            context = self.client.get(url).context
+            seen += [p['id'] for p in context['proposals']]
+            url = f"/vote/?after={context['next_cursor']}" if context['has_next'] else None
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(set(seen), set(MovieProposal.objects.values_list('id', flat=True)))
+        expected = list(MovieProposal.objects.order_by('-vote_count', '-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_legacy_page_parameter(self):
+        response = self.client.get('/vote/?page=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['total_pages'], len(response.context['proposals'])), (3, 5))
+        self.assertEqual(self.client.get('/vote/?page=x').context['page'], 1)
+
+    def test_malformed_cursors_fall_back_to_the_first_page(self):
+        first = [p['id'] for p in self.client.get('/vote/').context['proposals']]
+        for token in ('garbage', 'e30', '!!'):
+            with self.subTest(after=token):
+                context = self.client.get(f'/vote/?after={token}').context
+                self.assertEqual([p['id'] for p in context['proposals']], first)
+
+        for number in range(1, 31):
+            make_media(number, watched=True)
+        first = [m['number'] for m in self.client.get('/vote/?filter=watched').context['watched_movies']]
+        for token in ('abc', '1_x', '5_6'):
+            with self.subTest(before=token):
+                context = self.client.get(f'/vote/?filter=watched&before={token}').context
+                self.assertEqual([m['number'] for m in context['watched_movies']], first)
+
+
+@plain_static
+class VersionedETagTests(PageTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media = make_media(1, watched=True)
+        self.client.get('/vote/?filter=watched')  # sets the CSRF cookie, which the ETag covers
+
+    def test_unchanged_versions_answer_304(self):
+        for url in ('/vote/?filter=watched', f'/get_movie_ratings/?media_id={self.media.id}'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_bump_changes_the_etag(self):
+        url = '/vote/?filter=watched'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('media')
+            # Not visible until the transaction commits
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_differs_per_user_and_query(self):
+        url = '/vote/?filter=watched'
+        anonymous = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url + '&sort=popular')['ETag'], anonymous)
+        self.client.force_login(User.objects.create_user('alice', password='x' * 10))
+        self.client.get(url)  # login rotates the CSRF secret
+        self.assertNotEqual(self.client.get(url)['ETag'], anonymous)
+
+
+class ImportCsvTests(TestCase):
+    HEADER = ['Number', 'Title', 'Year', 'Duration', 'Age Rating', 'Rating', 'Votes', 'Metascore',
+              'Description', 'Watched', 'Skipped', 'Series', 'Poster URL']
+
+    def import_rows(self, rows, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8', delete=False) as f:
+            writer = csv.writer(f)
+            writer.writerow(self.HEADER)
+            writer.writerows(rows)
+        self.addCleanup(os.remove, f.name)
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_csv_to_db', f.name, '--batch', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reimport_updates_rows_and_links_ratings(self):
+        alice = User.objects.create_user('alice', password='x' * 10)
+        # Detached rating, e.g. left behind when its movie was deleted
+        MovieRating.objects.create(movie_title='LODZ', user=alice, rating=4)
+
+        output = self.import_rows([
+            [1, 'Łódź', 1999, '1h 30m', '12', 7.5, '1.2K', 70, 'First', 'FALSE', 'FALSE', 'FALSE', ''],
+            [2, 'Second', 2001, '2h', '16', 6.0, '900', '', 'Second', 'TRUE', 'FALSE', 'FALSE', ''],
+            ['x', 'Broken', 2001, '2h', '16', 6.0, '900', '', '', 'FALSE', 'FALSE', 'FALSE', ''],
+        ])
+        self.assertIn('Created: 2', output)
+        self.assertIn('Errors: 1', output)
+        self.assertIn('Ratings re-linked: 1', output)
+        lodz = Media.objects.get(number=1)
+        self.assertEqual(MovieRating.objects.get().media, lodz)
+        self.assertEqual(MovieRatingSummary.objects.get(media=lodz).rating_count, 1)
+
+        output = self.import_rows([
+            [1, 'Łódź', 1999, '2h 5m', '12', 8.0, '2M', 75, 'Changed', 'TRUE', 'FALSE', 'FALSE', ''],
+            [3, 'Third', 2010, '1h', '7', 5.0, '10', '', 'Third', 'FALSE', 'FALSE', 'FALSE', ''],
+            # A repeated number in one file: the later row wins
+            [3, 'Third, fixed', 2010, '1h 1m', '7', 5.0, '10', '', 'Third', 'FALSE', 'FALSE', 'FALSE', ''],
+        ])
+        self.assertIn('Created: 1', output)
+        self.assertEqual(Media.objects.count(), 3)
+        lodz = Media.objects.get(number=1)
+        self.assertEqual(
+            (lodz.pk, lodz.description, lodz.watched, lodz.duration_minutes, lodz.votes_count),
+            (MovieRating.objects.get().media_id, 'Changed', True, 125, 2_000_000),
+        )
+        self.assertEqual(Media.objects.get(number=3).title, 'Third, fixed')
+
+    def test_clear_relinks_and_rebuilds_summaries(self):
+        alice = User.objects.create_user('alice', password='x' * 10)
+        row = [1, 'Film', 1999, '1h 30m', '12', 7.5, '1K', 70, 'First', 'TRUE', 'FALSE', 'FALSE', '']
+        self.import_rows([row])
+        MovieRating.objects.create(media=Media.objects.get(), movie_title='Film', user=alice, rating=5)
+        MovieRatingSummary.rebuild()
+
+        self.import_rows([row], '--clear')
+        media = Media.objects.get()
+        self.assertEqual(MovieRating.objects.get().media, media)
+        self.assertEqual(MovieRatingSummary.objects.get(media=media).rating_sum, 5)
+
+
+class LogRetentionTests(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='x' * 10)
+        old = timezone.now() - timedelta(days=100)
+        self.old_ids = [
+            LogEntry.objects.create(action='login', user=self.alice, timestamp=old, details=f'old {i}').pk
+            for i in range(7)
+        ]
+        self.recent = LogEntry.objects.create(action='logout', user=self.alice)
+        self.cutoff = timezone.now() - timedelta(days=90)
+
+    def test_purge_deletes_in_chunks_up_to_the_cutoff(self):
+        # 7 rows in chunks of 3: two full chunks, one partial, one empty probe
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(LogEntry.purge(before=self.cutoff, batch_size=3), 7)
+        deletes = [q for q in queries if q['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        self.assertEqual(list(LogEntry.objects.values_list('pk', flat=True)), [self.recent.pk])
+
+        self.assertEqual(LogEntry.purge(before=self.cutoff, batch_size=3), 0)
+        self.assertEqual(LogEntry.purge(batch_size=1), 1)
+
+    def test_purge_exact_multiple_of_batch(self):
+        LogEntry.objects.filter(pk=self.old_ids[-1]).delete()
+        self.assertEqual(LogEntry.purge(before=self.cutoff, batch_size=3), 6)
+        self.assertEqual(LogEntry.objects.count(), 1)
+
+    def test_archive_holds_every_deleted_row(self):
+        path = os.path.join(tempfile.mkdtemp(), 'logs.jsonl.gz')
+        self.addCleanup(os.remove, path)
+        out = StringIO()
+        call_command('prune_logs', '--older-than', '90d', '--batch', '3', '--archive', path, stdout=out)
+        self.assertIn('Deleted 7', out.getvalue())
+
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual([row['id'] for row in rows], self.old_ids)
+        self.assertEqual(set(rows[0]), set(LogEntry.ARCHIVE_FIELDS))
+        self.assertEqual((rows[0]['user__username'], rows[0]['details']), ('alice', 'old 0'))
+        self.assertEqual(list(LogEntry.objects.values_list('pk', flat=True)), [self.recent.pk])
+
+    def test_dry_run_deletes_nothing(self):
+        out = StringIO()
+        call_command('prune_logs', '--older-than', '90d', '--dry-run', stdout=out)
+        self.assertIn('7 log entries', out.getvalue())
+        self.assertEqual(LogEntry.objects.count(), 8)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.lodz = make_media(1, title='Łódź nocą', description='Miasto po zmroku.')
+        self.amelia = make_media(2, title='Amelia', description='Paryż i ogrodowy krasnal.')
+        self.garden = make_media(3, title='Ogród', description='Amelia nie gra tu żadnej roli.')
+
+    def ids(self, query):
+        return [media_id for media_id, _ in search_media(query)]
+
+    def test_full_text_index(self):
+        self.assertEqual(self.ids('łódź'), [self.lodz.id])
+        self.assertEqual(self.ids('ŁODZ NOCA'), [self.lodz.id])  # case and combining accents folded
+        self.assertEqual(self.ids('zmrok'), [self.lodz.id])  # last term is a prefix
+        self.assertEqual(self.ids('paryż krasnal'), [self.amelia.id])
+        self.assertEqual(self.ids('"; DROP TABLE home_media; --'), [])
+        # Title hits rank above description hits
+        self.assertEqual(self.ids('amelia'), [self.amelia.id, self.garden.id])
+
+    def test_letters_outside_unicode61_folding(self):
+        # ł is its own letter to unicode61, unlike normalize_title (see home/search.py)
+        self.assertEqual(normalize_title(self.lodz.title), 'lodz noca')
+        self.assertEqual(self.ids('lodz'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        Media.objects.filter(pk=self.amelia.pk).update(title='Fabuleux destin')
+        self.assertEqual(self.ids('fabuleux'), [self.amelia.id])
+        self.assertEqual(self.ids('amelia'), [self.garden.id])
+        self.garden.delete()
+        self.assertEqual(self.ids('amelia'), [])
+
+    def test_falls_back_to_icontains_without_the_index(self):
+        drop_search_index()
+        self.assertEqual(self.ids('AMELIA'), [self.garden.id, self.amelia.id])  # newest number first
+        # SQLite's LIKE only folds ASCII case
+        self.assertEqual(self.ids('Łódź noc'), [self.lodz.id])
+        self.assertEqual(self.ids(''), [])
+
+
+class CatalogStatsTests(PageTestCase):
+
+    def setUp(self):
+        super().setUp()
+        make_media(1, year=1994, duration='2h 22m', rating=9.0, watched=True)
+        make_media(2, year=1999, duration='1h 30m', rating=7.0, watched=True, skipped=True)
+        make_media(3, year=1999, duration='unknown', skipped=True)
+        make_media(4, year=2004, duration='1h 40m')
+
+    def stats(self):
+        return self.client.get('/stats/').json()
+
+    def test_aggregates(self):
+        stats = self.stats()
+        self.assertEqual(stats['totals'], {
+            'total': 4, 'watched_count': 2, 'skipped_count': 1, 'remaining_count': 1, 'unknown_duration': 1,
+            'minutes': 332, 'watched_minutes': 232, 'remaining_minutes': 100, 'avg_watched_rating': 8.0,
+        })
+        nineties, noughties = stats['per_decade']
+        self.assertEqual(
+            (nineties['decade'], nineties['total'], nineties['watched_count'], nineties['skipped_count']),
+            (1990, 3, 2, 1),
+        )
+        self.assertEqual((noughties['decade'], noughties['remaining_count'], noughties['avg_watched_rating']), (2000, 1, None))
+        self.assertEqual([year['year'] for year in stats['per_year']], [1994, 1999, 2004])
+
+    def test_cache_follows_the_media_version(self):
+        self.assertEqual(self.stats()['totals']['watched_count'], 2)
+
+        # QuerySet.update() sends no signal: still served from the cache
+        Media.objects.filter(number=4).update(watched=True)
+        self.assertEqual(self.stats()['totals']['watched_count'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('media')
+        self.assertEqual(self.stats()['totals']['watched_count'], 3)
+
+        # save() bumps the version through the post_save receiver
+        with self.captureOnCommitCallbacks(execute=True):
+            make_media(5, year=2020, watched=True)
+        self.assertEqual(self.stats()['totals']['watched_count'], 4)
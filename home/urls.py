@@ -13,6 +13,8 @@ urlpatterns = [
     path('recommend_next_watch/', recommend_next_watch, name='recommend_next_watch'),
     path('update_posters/', update_posters, name='update_posters'),
     path('find_next_shortest_movie/', find_next_shortest_movie, name='find_next_shortest_movie'),
+    path('plan_movie_night/', plan_movie_night, name='plan_movie_night'),
+    path('stats/', catalog_stats, name='catalog_stats'),
     path('login/', redirect_to_admin_signin, name='login'),
     path('logout/', logout_view, name='logout'),
     path('change_password/', change_password, name='change_password'),
@@ -21,13 +23,19 @@ urlpatterns = [
     path('propose/', propose_movie, name='propose'),
     path('search_imdb/', search_imdb, name='search_imdb'),
     path('vote/', vote_page, name='vote'),
+    path('media/<int:media_id>/description/', media_description, name='media_description'),
+    path('search/', media_search, name='media_search'),
     path('vote/<int:proposal_id>/', vote_proposal, name='vote_proposal'),
+    path('vote/events/', vote_events, name='vote_events'),
     path('delete_proposal/<int:proposal_id>/', delete_proposal, name='delete_proposal'),
     path('proposals/<int:proposal_id>/watched/', mark_watched, name='mark_watched'),
     path('admin/logs/', admin_logs, name='admin_logs'),
     path('admin/logs/clear/', clear_logs, name='clear_logs'),
+    path('admin/activity/', admin_activity, name='admin_activity'),
+    path('admin/activity/stats/', admin_activity_stats, name='admin_activity_stats'),
     path('rate_movie/', rate_movie, name='rate_movie'),
     path('get_movie_ratings/', get_movie_ratings, name='get_movie_ratings'),
+    path('get_movie_ratings_batch/', get_movie_ratings_batch, name='get_movie_ratings_batch'),
     path('remove_movie_rating/', remove_movie_rating, name='remove_movie_rating'),
     path('remove_watched_movie/', remove_watched_movie, name='remove_watched_movie'),
 ]
@@ -0,0 +1,57 @@
+"""
+Small parsing helpers shared by views, models, management commands and migrations.
+"""
+import re
+import unicodedata
+
+DURATION_RE = re.compile(r'\s*(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?', re.IGNORECASE)
+
+
+def parse_duration(duration):
+    """Parse a duration string like '1h 48m', '2h' or '95m' into total minutes (0 if invalid)."""
+    match = DURATION_RE.match(duration or '')
+    if not match:
+        return 0
+    hours = int(match.group(1) or 0)
+    minutes = int(match.group(2) or 0)
+    return hours * 60 + minutes
+
+
+VOTES_RE = re.compile(r'^\s*([\d.,\s]*\d)\s*([kKmMbB]?)\s*$')
+VOTES_MULTIPLIERS = {'': 1, 'k': 1_000, 'm': 1_000_000, 'b': 1_000_000_000}
+
+
+def parse_votes(votes):
+    """Parse a vote count like '3M', '850K', '1.2M' or '12,345' into an int (0 if invalid)."""
+    match = VOTES_RE.match(str(votes or ''))
+    if not match:
+        return 0
+    number, suffix = match.groups()
+    number = number.replace(' ', '')
+    if suffix:
+        # '1,2M' and '1.2M' are decimals; separators never group digits before a suffix
+        number = number.replace(',', '.')
+    else:
+        number = number.replace(',', '').replace('.', '')
+    try:
+        return int(round(float(number) * VOTES_MULTIPLIERS[suffix.lower()]))
+    except ValueError:
+        return 0
+
+
+# Letters that Unicode does not decompose into base letter + accent
+TITLE_FOLD = str.maketrans({
+    'ł': 'l', 'Ł': 'l', 'đ': 'd', 'Đ': 'd', 'ø': 'o', 'Ø': 'o',
+    'æ': 'ae', 'Æ': 'ae', 'œ': 'oe', 'Œ': 'oe', 'ı': 'i', 'þ': 'th', 'Þ': 'th',
+})
+
+
+def normalize_title(title):
+    """
+    Matching key for a title: casefolded, accents stripped, whitespace collapsed.
+
+    'Ojciec  Chrzestny', 'ojciec chrzestny' and 'Żółć' / 'zolc' map to the same key.
+    """
+    decomposed = unicodedata.normalize('NFKD', (title or '').translate(TITLE_FOLD))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
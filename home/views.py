@@ -6,9 +6,10 @@ import os
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 import json
+import asyncio
+import base64
 import shutil
 from datetime import datetime
-from django.views.decorators.cache import cache_page
 from django.core.cache import cache
 from django.utils.decorators import method_decorator
 from django.shortcuts import render
@@ -17,11 +18,19 @@ import re
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login as auth_login
 from .forms import CustomLoginForm, CustomSignupForm, AdminResetPasswordForm, ChangePasswordForm, MovieProposalForm
-from .models import MovieProposal, ProposalVote, LogEntry, MovieRating, Media
+from .models import MovieProposal, ProposalVote, LogEntry, MovieRating, MovieRatingSummary, Media
+from .imdb import is_cache_expired, refresher as imdb_refresher
+from .data_versions import VERSIONED_CACHE_TIMEOUT, bump_version, get_versions, versioned_etag
+from .events import broadcaster, publish
+from .audit import audit_logger
+from .planner import MAX_FILMS_PER_NIGHT, plan_nights
+from .search import search_media
+from .utils import normalize_title
 from django.views.decorators.http import require_POST
 from django.http import FileResponse
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
 
 
 import traceback
@@ -43,8 +52,10 @@ def clear_logs(request):
     
     try:
         from .models import LogEntry
-        count = LogEntry.objects.count()
-        LogEntry.objects.all().delete()
+        # Buffered entries are older than this request; clear them too.
+        # Chunked delete, same path as the prune_logs command
+        audit_logger.flush()
+        count = LogEntry.purge()
         log_action(request, 'clear_logs', details=f'Usunięto {count} logów')  # log samego czyszczenia
         return JsonResponse({
             'status': 'success', 
@@ -61,9 +72,8 @@ def download_sqlite(request):
     return FileResponse(open(db_path, 'rb'), as_attachment=True, filename='db.sqlite3')
 
 def log_action(request, action, proposal_id=None, proposal_title='', details=''):
-    """Log user action to database."""
-    from .models import LogEntry
-    LogEntry.objects.create(
+    """Log user action to database (buffered, see home/audit.py)."""
+    audit_logger.log(
         user=request.user if request.user.is_authenticated else None,
         action=action,
         proposal_id=proposal_id,
@@ -123,35 +133,68 @@ def index(request):
     """Redirect to vote page. Home page now shows movie proposals to vote on."""
     return redirect('vote')
 
-@csrf_exempt
 def update_entry(request):
-    """Update a Media entry's watched or skipped status."""
+    """
+    Admin: update Media entries' watched or skipped status.
+
+    ``{"id": 12, "field": "watched"}`` toggles one entry atomically and returns
+    the new state; ``{"ids": [12, 13], "field": "watched", "value": true}`` sets
+    the state of many entries in one statement.
+    """
+    if not request.user.is_authenticated or request.user.username != 'admin':
+        return JsonResponse({"status": "error", "message": "Brak dostępu."})
+    
     if request.method == "POST":
         try:
             # Parse the request payload
             data = json.loads(request.body)
-            entry_id = data.get("id")  # Entry number as integer
             field = data.get("field")  # Field to update (watched or skipped)
+            entry_id = data.get("id")  # Entry number as integer
+            entry_ids = data.get("ids")  # Entry numbers for a bulk update
 
-            if not entry_id or not field:
+            if not field or (not entry_id and not entry_ids):
                 return JsonResponse({"status": "error", "message": "Brakuje wymaganych danych."})
+            if field not in Media.STATUS_FIELDS:
+                return JsonResponse({"status": "error", "message": f"Nieznane pole: {field}"})
 
-            # Get the media entry by number
+            if entry_ids:
+                value = data.get("value")
+                if not isinstance(entry_ids, list) or not isinstance(value, bool):
+                    return JsonResponse({"status": "error", "message": "Nieprawidłowe dane."})
+                try:
+                    numbers = {int(number) for number in entry_ids}
+                except (TypeError, ValueError):
+                    return JsonResponse({"status": "error", "message": "Nieprawidłowe numery filmów."})
+                with transaction.atomic():
+                    updated = Media.set_status(numbers, field, value)
+                    if updated:
+                        # QuerySet.update() sends no post_save signal
+                        bump_version('media')
+                return JsonResponse({
+                    "status": "success",
+                    "message": f"Zaktualizowano {updated} filmów.",
+                    "field": field,
+                    "value": value,
+                    "updated": updated,
+                })
+
+            # Flip the flag in the database, so concurrent clicks cannot overwrite each other
             try:
-                media = Media.objects.get(number=int(entry_id))
-            except (Media.DoesNotExist, ValueError):
+                with transaction.atomic():
+                    value = Media.toggle_status(int(entry_id), field)
+                    if value is not None:
+                        bump_version('media')
+            except (TypeError, ValueError):
+                value = None
+            if value is None:
                 return JsonResponse({"status": "error", "message": f"Film o numerze {entry_id} nie znaleziony."})
 
-            # Update the field
-            if field == "watched":
-                media.watched = not media.watched
-            elif field == "skipped":
-                media.skipped = not media.skipped
-            else:
-                return JsonResponse({"status": "error", "message": f"Nieznane pole: {field}"})
-            
-            media.save()
-            return JsonResponse({"status": "success", "message": f"Film {entry_id} zaktualizowany."})
+            return JsonResponse({
+                "status": "success",
+                "message": f"Film {entry_id} zaktualizowany.",
+                "field": field,
+                "value": value,
+            })
         except Exception as e:
             return JsonResponse({"status": "error", "message": str(e)})
     return JsonResponse({"status": "error", "message": "Nieprawidłowa metoda żądania."})
@@ -361,38 +404,56 @@ def restore_backup(request):
                         error_count += 1
                         print(f"Error importing row {row}: {str(e)}")
             
+            # Ratings detached when their Media was deleted (SET_NULL) belong to the restored rows again
+            with transaction.atomic():
+                linked = MovieRating.link_unresolved()
+                if linked:
+                    MovieRatingSummary.rebuild()
+                    bump_version('ratings')
+            
             msg = f"Kopia zapasowa {filename} przywrócona. Zaimportowano: {imported_count}, Błędy: {error_count}"
+            if linked:
+                msg += f", Przywrócone oceny: {linked}"
             return JsonResponse({"status": "success", "message": msg})
         except Exception as e:
             return JsonResponse({"status": "error", "message": str(e)})
     return JsonResponse({"status": "error", "message": "Nieprawidłowa metoda żądania."})
 
 
-def recommend_next_watch(request):
-    """Recommend the next movie to watch from database."""
-    try:
-        # Query unwatched and not skipped movies from Media model
-        unwatched_movies = Media.objects.filter(
-            watched=False,
-            skipped=False
-        ).order_by('-number')
-        
-        if not unwatched_movies.exists():
-            return render(request, 'pages/recommend_next_watch.html', {'error': 'Brak filmów dostępnych do rekomendacji.'})
+def _closest_by_duration(queryset, minutes):
+    """Movie in ``queryset`` whose duration_minutes is closest to ``minutes`` (two indexed single-row lookups)."""
+    timed = queryset.filter(duration_minutes__isnull=False)
+    above = timed.filter(duration_minutes__gte=minutes).order_by('duration_minutes', '-number').first()
+    below = timed.filter(duration_minutes__lt=minutes).order_by('-duration_minutes', '-number').first()
+    if above is None or below is None:
+        return above or below
+    return above if above.duration_minutes - minutes <= minutes - below.duration_minutes else below
+
 
-        # Find the next movie (highest number / most recent)
-        next_movie = unwatched_movies.first()
+# Target length of a movie night (next-in-line film plus one more), in minutes
+MOVIE_NIGHT_TARGET_MINUTES = 270
 
-        # Find the shortest movie
-        unwatched_list = list(unwatched_movies)
-        shortest_movie = min(unwatched_list, key=lambda x: parse_duration(x.duration))
 
-        # Calculate total duration
-        total_duration_minutes = parse_duration(next_movie.duration) + parse_duration(shortest_movie.duration)
-        total_hours = total_duration_minutes // 60
-        total_minutes = total_duration_minutes % 60
+def _build_recommendations():
+    """Template context for recommend_next_watch (safe to cache and share between users)."""
+    # Unwatched and not skipped movies; each pick below is a single-row indexed query
+    unwatched_movies = Media.objects.filter(watched=False, skipped=False)
 
-        recommendations = {
+    # Find the next movie (highest number / most recent)
+    next_movie = unwatched_movies.order_by('-number').first()
+    if next_movie is None:
+        return {'error': 'Brak filmów dostępnych do rekomendacji.'}
+
+    # Find the shortest movie (movies with an unknown duration are skipped)
+    shortest_movie = unwatched_movies.filter(
+        duration_minutes__isnull=False
+    ).order_by('duration_minutes', '-number').first() or next_movie
+
+    # Calculate total duration
+    total_duration_minutes = (next_movie.duration_minutes or 0) + (shortest_movie.duration_minutes or 0)
+
+    return {
+        'recommendations': {
             'latest': {
                 'id': next_movie.number,
                 'title': next_movie.title,
@@ -407,28 +468,34 @@ def recommend_next_watch(request):
                 'duration': shortest_movie.duration,
                 'description': shortest_movie.description,
             },
-        }
+        },
+        'total_hours': total_duration_minutes // 60,
+        'total_minutes': total_duration_minutes % 60,
+    }
 
-        return render(request, 'pages/recommend_next_watch.html', {
-            'recommendations': recommendations,
-            'total_hours': total_hours,
-            'total_minutes': total_minutes,
-        })
+
+@versioned_etag('media')
+def recommend_next_watch(request):
+    """Recommend the next movie to watch from database.
+
+    The result only changes when a Media row does, so it is cached under the
+    media data version (bumped by the Media signals in home/signals.py).
+    """
+    try:
+        cache_key = 'recommend_next_watch:{}'.format(get_versions('media')['media'])
+        context = cache.get(cache_key)
+        if context is None:
+            context = _build_recommendations()
+            cache.set(cache_key, context, VERSIONED_CACHE_TIMEOUT)
+        return render(request, 'pages/recommend_next_watch.html', context)
 
     except Exception as e:
         return render(request, 'pages/recommend_next_watch.html', {'error': str(e)})
 
-def parse_duration(duration):
-    """Parse duration in the format 'Xh Ym' and return total minutes."""
-    match = re.match(r'(?:(\d+)h)?\s*(?:(\d+)m)?', duration)
-    if match:
-        hours = int(match.group(1)) if match.group(1) else 0
-        minutes = int(match.group(2)) if match.group(2) else 0
-        return hours * 60 + minutes
-    return 0  # Return 0 if the format is invalid
+
 @csrf_exempt
 def find_next_shortest_movie(request):
-    """Find the next shortest movie to watch from database."""
+    """Find the movie that best fills the movie night next to the next-in-line one."""
     try:
         if request.method != "POST":
             return JsonResponse({"status": "error", "message": "Nieprawidłowa metoda żądania."})
@@ -437,9 +504,11 @@ def find_next_shortest_movie(request):
         unwatched_movies = Media.objects.filter(
             watched=False,
             skipped=False
-        ).order_by('-number')
+        )
 
-        if not unwatched_movies.exists():
+        # Find the next in line movie (highest number / most recent)
+        next_in_line_movie = unwatched_movies.order_by('-number').first()
+        if next_in_line_movie is None:
             return JsonResponse({"status": "error", "message": "Brak filmów dostępnych."})
 
         # Get the currently displayed shortest movie number from the request
@@ -448,31 +517,19 @@ def find_next_shortest_movie(request):
         except (json.JSONDecodeError, AttributeError):
             current_shortest_id = None
 
-        # Exclude the currently displayed shortest movie
+        # Exclude the next in line movie itself and the currently displayed one
+        candidates = unwatched_movies.exclude(number=next_in_line_movie.number)
         if current_shortest_id:
-            unwatched_movies = unwatched_movies.exclude(number=current_shortest_id)
+            candidates = candidates.exclude(number=current_shortest_id)
 
-        if not unwatched_movies.exists():
+        # The movie whose length is closest to what is left of the target
+        next_in_line_duration = next_in_line_movie.duration_minutes or 0
+        best_match = _closest_by_duration(candidates, MOVIE_NIGHT_TARGET_MINUTES - next_in_line_duration)
+        if best_match is None:
             return JsonResponse({"status": "error", "message": "Brak innych filmów dostępnych."})
 
-        # Convert to list for processing
-        unwatched_list = list(unwatched_movies)
-        
-        # Find the next in line movie (highest number / most recent)
-        next_in_line_movie = unwatched_list[0]  # Already ordered by -number
-
-        # Target duration is 4.5 hours (270 minutes)
-        target_duration = 270
-        next_in_line_duration = parse_duration(next_in_line_movie.duration)
-
-        # Find the movie that, when summed with the next in line movie, is closest to 270 minutes
-        best_match = min(
-            unwatched_list,
-            key=lambda x: abs((parse_duration(x.duration) + next_in_line_duration) - target_duration)
-        )
-
         # Calculate the total duration
-        total_minutes = parse_duration(next_in_line_movie.duration) + parse_duration(best_match.duration)
+        total_minutes = next_in_line_duration + best_match.duration_minutes
         total_hours = total_minutes // 60
         remaining_minutes = total_minutes % 60
 
@@ -495,14 +552,137 @@ def find_next_shortest_movie(request):
         return JsonResponse({"status": "error", "message": str(e)})
 
 
-def parse_duration(duration):
-    """Parse a duration string like '1h 48m' into total minutes."""
-    match = re.match(r'(?:(\d+)h)?\s*(?:(\d+)m)?', duration)
-    if not match:
-        return 0
-    hours = int(match.group(1) or 0)
-    minutes = int(match.group(2) or 0)
-    return hours * 60 + minutes
+MOVIE_NIGHT_MAX_PLANS = 20
+MOVIE_NIGHT_MAX_TARGET = 12 * 60  # minutes
+
+
+@versioned_etag('media')
+def plan_movie_night(request):
+    """
+    Suggest combinations of unwatched films for one night (JSON).
+
+    GET parameters: ``target`` (minutes, default 270), ``tolerance`` (minutes,
+    default 15), ``k`` films per night (1-4, default 2), ``exclude_series``,
+    ``min_rating`` and ``limit`` (number of plans, default 5). The target is
+    capped at 12 hours and the tolerance at the target; the response reports
+    the values used.
+    """
+    try:
+        target = int(request.GET.get('target', MOVIE_NIGHT_TARGET_MINUTES))
+        tolerance = int(request.GET.get('tolerance', 15))
+        k = int(request.GET.get('k', 2))
+        limit = int(request.GET.get('limit', 5))
+        min_rating = float(request.GET['min_rating']) if request.GET.get('min_rating') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Nieprawidłowe parametry.'})
+    if not 1 <= k <= MAX_FILMS_PER_NIGHT:
+        return JsonResponse({'status': 'error', 'message': f'Liczba filmów musi być od 1 do {MAX_FILMS_PER_NIGHT}.'})
+    if target <= 0 or tolerance < 0:
+        return JsonResponse({'status': 'error', 'message': 'Nieprawidłowy czas docelowy lub tolerancja.'})
+    # Public endpoint: a huge window only costs CPU, it cannot find better plans
+    target = min(target, MOVIE_NIGHT_MAX_TARGET)
+    tolerance = min(tolerance, target)
+    limit = min(max(limit, 1), MOVIE_NIGHT_MAX_PLANS)
+    
+    candidates = Media.objects.filter(watched=False, skipped=False, duration_minutes__isnull=False)
+    if request.GET.get('exclude_series') in ('1', 'true', 'on'):
+        candidates = candidates.filter(series=False)
+    if min_rating is not None:
+        candidates = candidates.filter(rating__gte=min_rating)
+    
+    plans = plan_nights(candidates.values_list('duration_minutes', 'id'), target, tolerance, k, limit)
+    
+    # One query for the films of all returned plans
+    movies = {
+        m['id']: m for m in Media.objects.filter(
+            id__in={movie_id for _, ids in plans for movie_id in ids}
+        ).values('id', 'number', 'title', 'year', 'duration', 'duration_minutes', 'rating', 'series')
+    }
+    return JsonResponse({
+        'status': 'success',
+        'target': target,
+        'tolerance': tolerance,
+        'plans': [
+            {
+                'total_minutes': total,
+                'deviation': total - target,
+                'movies': [
+                    dict(movies[movie_id], id=movies[movie_id]['number'], media_id=movie_id)
+                    for movie_id in ids
+                ],
+            }
+            for total, ids in plans
+        ],
+    })
+
+
+# Per-year counters returned by the aggregate query (and summed into decades/totals)
+CATALOG_STATS_FIELDS = (
+    'total', 'watched_count', 'skipped_count', 'remaining_count', 'unknown_duration',
+    'minutes', 'watched_minutes', 'remaining_minutes', 'watched_rating_sum',
+)
+
+
+def _build_catalog_stats():
+    """
+    Watched/skipped/remaining counts, durations and the average rating of
+    watched films, per year, per decade and in total.
+
+    Everything comes from a single GROUP BY year query with conditional
+    aggregates; decades and totals are folded in Python from the per-year rows.
+    A film counts as skipped only while it is not watched, so watched, skipped
+    and remaining always add up to the total.
+    """
+    from django.db.models import Count, Sum
+
+    watched = Q(watched=True)
+    skipped = Q(watched=False, skipped=True)
+    remaining = Q(watched=False, skipped=False)
+    rows = Media.objects.order_by().values('year').annotate(
+        total=Count('id'),
+        watched_count=Count('id', filter=watched),
+        skipped_count=Count('id', filter=skipped),
+        remaining_count=Count('id', filter=remaining),
+        unknown_duration=Count('id', filter=Q(duration_minutes__isnull=True)),
+        minutes=Sum('duration_minutes'),
+        watched_minutes=Sum('duration_minutes', filter=watched),
+        remaining_minutes=Sum('duration_minutes', filter=remaining),
+        watched_rating_sum=Sum('rating', filter=watched),
+    ).order_by('year')
+
+    def summary(bucket):
+        # Sums over no rows come back as NULL
+        counters = {field: bucket.get(field) or 0 for field in CATALOG_STATS_FIELDS}
+        rating_sum = counters.pop('watched_rating_sum')
+        watched_count = counters['watched_count']
+        counters['avg_watched_rating'] = round(rating_sum / watched_count, 2) if watched_count else None
+        return counters
+
+    per_year, decades, totals = [], {}, dict.fromkeys(CATALOG_STATS_FIELDS, 0)
+    for row in rows:
+        per_year.append({'year': row['year'], **summary(row)})
+        decade = decades.setdefault(row['year'] // 10 * 10, dict.fromkeys(CATALOG_STATS_FIELDS, 0))
+        for field in CATALOG_STATS_FIELDS:
+            value = row[field] or 0
+            decade[field] += value
+            totals[field] += value
+
+    return {
+        'totals': summary(totals),
+        'per_decade': [{'decade': decade, **summary(decades[decade])} for decade in sorted(decades)],
+        'per_year': per_year,
+    }
+
+
+@versioned_etag('media')
+def catalog_stats(request):
+    """Catalog statistics (JSON), cached under the media data version like recommend_next_watch."""
+    cache_key = 'catalog_stats:{}'.format(get_versions('media')['media'])
+    stats = cache.get(cache_key)
+    if stats is None:
+        stats = _build_catalog_stats()
+        cache.set(cache_key, stats, VERSIONED_CACHE_TIMEOUT)
+    return JsonResponse({'status': 'success', **stats})
 
 
 def login_view(request):
@@ -589,7 +769,18 @@ def admin_view(request):
         if action == 'delete' and user_ids:
             try:
                 from django.db.models import Q
-                User.objects.filter(id__in=user_ids).delete()
+                # Deleting users cascades to their votes; keep vote counters in sync
+                voted_proposal_ids = list(
+                    ProposalVote.objects.filter(voter_id__in=user_ids).values_list('proposal_id', flat=True).distinct()
+                )
+                had_ratings = MovieRating.objects.filter(user_id__in=user_ids).exists()
+                with transaction.atomic():
+                    User.objects.filter(id__in=user_ids).delete()
+                    MovieProposal.recount_votes(MovieProposal.objects.filter(id__in=voted_proposal_ids))
+                    bump_version('proposals', 'votes')
+                    if had_ratings:
+                        MovieRatingSummary.rebuild()
+                        bump_version('ratings')
                 message = f"Usunięto {len(user_ids)} użytkownika(ów)"
                 users = User.objects.all()
                 return render(request, 'pages/admin.html', {'users': users, 'message': message})
@@ -751,14 +942,21 @@ def propose_movie(request):
                 message = f"Osiągnąłeś maksymalną liczbę aktywnych propozycji ({user_limit}). Usuń lub czekaj aż jedna z Twoich propozycji będzie oznaczona jako oglądnięta."
                 return render(request, 'pages/propose.html', {'form': form, 'message': message, 'proposal_limit': user_limit})
             
-            # Check if movie with this title already exists
-            existing = MovieProposal.objects.filter(title__iexact=title).first()
+            # Check if movie with this title already exists (ignoring case, accents and spacing)
+            existing = MovieProposal.objects.filter(title_key=normalize_title(title)).select_related('proposer').first()
             if existing:
                 message = f"Film '{title}' został już zaproponowany przez {existing.proposer.username}. Zagłosuj na niego zamiast tego!"
                 return render(request, 'pages/propose.html', {'form': form, 'message': message, 'proposal_limit': user_limit})
             
-            # Create new proposal
-            MovieProposal.objects.create(title=title, imdb_id=imdb_id, proposer=request.user)
+            # Create new proposal; the unique title_key settles concurrent duplicates
+            try:
+                with transaction.atomic():
+                    proposal = MovieProposal.objects.create(title=title, imdb_id=imdb_id, proposer=request.user)
+            except IntegrityError:
+                message = f"Film '{title}' został już zaproponowany. Zagłosuj na niego zamiast tego!"
+                return render(request, 'pages/propose.html', {'form': form, 'message': message, 'proposal_limit': user_limit})
+            bump_version('proposals')
+            publish('proposal_add', id=proposal.id, title=title, proposer=request.user.username)
             message = f"Film '{title}' został zaproponowany! (Aktywne: {user_proposal_count + 1}/{user_limit})"
             
             log_action(request, 'proposal_create', proposal_title=title)
@@ -844,60 +1042,180 @@ def search_imdb(request):
 from django.db.models import Count
 import requests
 
-@cache_page(60)  # Cache the page for 60 seconds for anonymous users
+def _encode_proposal_cursor(proposal):
+    """Opaque ?after= token for keyset pagination on (vote_count, created_at, id)."""
+    raw = json.dumps([proposal.vote_count, proposal.created_at.isoformat(), proposal.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_proposal_cursor(token):
+    """Decode an ?after= token into (vote_count, created_at, id), or None if it is invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        vote_count, created_at, proposal_id = json.loads(raw)
+        return int(vote_count), datetime.fromisoformat(created_at), int(proposal_id)
+    except (ValueError, TypeError):
+        return None
+
+
+WATCHED_PAGE_SIZE = 24
+
+
+@versioned_etag('proposals', 'votes', 'media')
 def vote_page(request):
-    """Show all movie proposals sorted by votes, or watched movies if filter=watched."""
-    from django.db.models import Count
-    import requests
-    
+    """Show all movie proposals sorted by votes, or watched movies if filter=watched.
+
+    Proposals are paginated with opaque ``?after=`` cursors (keyset on
+    vote_count, created_at, id), which costs neither an OFFSET scan nor a
+    count. The legacy ``?page=N`` parameter still works and additionally
+    reports the exact total.
+
+    The proposals page is cached in two layers: a payload shared by all
+    users (keyed by the proposals/votes data versions) and a per-user
+    overlay of the user's votes that is merged in at render time. Repeat
+    requests with a current ``If-None-Match`` get a 304 without either.
+    """
     filter_type = request.GET.get('filter', 'proposals')
-    page = int(request.GET.get('page', 1))  # Pagination support
     items_per_page = 20  # Show 20 proposals per page
     
     # If filter is 'watched', show watched movies from database
     if filter_type == 'watched':
-        # Query watched movies from Media model, ordered by number descending
-        watched_movies = Media.objects.filter(
-            watched=True
-        ).order_by('-number').values(
-            'number', 'title', 'year', 'duration', 'age_rating', 'rating',
-            'votes', 'metascore', 'description', 'poster_url'
-        )
+        # Keyset pagination on the (watched, number) index: ?before=<number>
+        # continues below the last card shown. With ?sort=popular the list is
+        # ordered by (votes_count, number) instead and the cursor is
+        # "<votes_count>_<number>". Only the fields the cards display are
+        # loaded; descriptions are fetched on demand.
+        sort = 'popular' if request.GET.get('sort') == 'popular' else 'newest'
+        watched_movies = Media.objects.filter(watched=True)
+        try:
+            before = [int(part) for part in request.GET['before'].split('_')] if request.GET.get('before') else None
+        except ValueError:
+            before = None
+        if sort == 'popular':
+            watched_movies = watched_movies.order_by('-votes_count', '-number')
+            if before and len(before) == 2:
+                watched_movies = watched_movies.filter(
+                    Q(votes_count__lt=before[0]) | Q(votes_count=before[0], number__lt=before[1])
+                )
+        else:
+            watched_movies = watched_movies.order_by('-number')
+            if before and len(before) == 1:
+                watched_movies = watched_movies.filter(number__lt=before[0])
         
-        # Convert to list of dicts for template compatibility
-        watched_movies_list = list(watched_movies)
+        watched_movies_list = list(watched_movies.values(
+            'id', 'number', 'title', 'year', 'duration', 'rating', 'poster_url', 'votes', 'votes_count'
+        )[:WATCHED_PAGE_SIZE + 1])
+        next_before = None
+        if len(watched_movies_list) > WATCHED_PAGE_SIZE:
+            watched_movies_list = watched_movies_list[:WATCHED_PAGE_SIZE]
+            last = watched_movies_list[-1]
+            next_before = f"{last['votes_count']}_{last['number']}" if sort == 'popular' else last['number']
         
-        return render(request, 'pages/vote.html', {
+        context = {
             'proposals': None,
             'watched_movies': watched_movies_list,
+            'next_before': next_before,
+            'sort': sort,
             'is_authenticated': request.user.is_authenticated,
             'is_admin': request.user.is_authenticated and request.user.username == 'admin',
             'filter_type': 'watched'
-        })
+        }
+        # Infinite scroll requests only need the next batch of cards
+        if request.GET.get('partial'):
+            return render(request, 'partials/watched_cards.html', context)
+        return render(request, 'pages/vote.html', context)
     
     # Default: show proposals to vote on
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    # Query proposals with proposer in one go (avoid N+1)
-    proposals = MovieProposal.objects.select_related('proposer').annotate(
-        vote_count=Count('proposal_votes')
-    ).order_by('-vote_count', '-created_at')
+    # Pagination: keyset cursor by default, OFFSET only for legacy ?page= links
+    after = request.GET.get('after') or ''
+    cursor = _decode_proposal_cursor(after) if after else None
+    page = None
+    if not cursor and 'page' in request.GET:
+        try:
+            page = max(int(request.GET['page']), 1)
+        except ValueError:
+            page = 1
     
-    # Pagination
-    total_count = proposals.count()
-    start_idx = (page - 1) * items_per_page
-    end_idx = start_idx + items_per_page
-    proposals_page = proposals[start_idx:end_idx]
+    # Layer 1: user-independent page payload, shared by everyone and
+    # invalidated by bumping the proposals/votes data versions
+    versions = get_versions('proposals', 'votes')
+    cache_key = 'vote_page:proposals:{}:{}:{}:{}'.format(
+        versions['proposals'], versions['votes'], after if cursor else '', page or '',
+    )
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = _build_proposals_payload(cursor, page, items_per_page)
+        cache.set(cache_key, payload, VERSIONED_CACHE_TIMEOUT)
     
+    # Layer 2: cheap per-user overlay, merged at render time and never cached
     user_votes = set()
     if request.user.is_authenticated:
         user_votes = set(
-            ProposalVote.objects.filter(voter=request.user).values_list('proposal_id', flat=True)
+            ProposalVote.objects.filter(
+                voter=request.user,
+                proposal_id__in=[p['id'] for p in payload['proposals']],
+            ).values_list('proposal_id', flat=True)
+        )
+    proposals_with_votes = [
+        dict(
+            p,
+            user_voted=p['id'] in user_votes,
+            is_proposer=request.user.is_authenticated and request.user.id == p['proposer_id'],
         )
+        for p in payload['proposals']
+    ]
     
-    proposals_with_votes = []
-    proposals_to_cache = []  # Track proposals that need fresh data
+    # Calculate pagination info (exact totals only in legacy ?page= mode)
+    total_count = payload['total_count']
+    total_pages = (total_count + items_per_page - 1) // items_per_page if total_count is not None else None
+    has_prev = bool(cursor) or (page or 1) > 1
+    
+    return render(request, 'pages/vote.html', {
+        'proposals': proposals_with_votes,
+        'watched_movies': None,
+        'is_authenticated': request.user.is_authenticated,
+        'is_admin': request.user.is_authenticated and request.user.username == 'admin',
+        'filter_type': 'proposals',
+        'page': page,
+        'total_pages': total_pages,
+        'has_next': payload['has_next'],
+        'has_prev': has_prev,
+        'next_cursor': payload['next_cursor'],
+        'total_proposals': total_count,
+    })
+
+
+def _build_proposals_payload(cursor, page, items_per_page):
+    """Build the user-independent part of a proposals page (safe to share between users)."""
+    from django.utils import timezone
+    
+    # Query proposals with proposer in one go (avoid N+1); vote_count is a
+    # denormalized column, so ranking is an index scan instead of a GROUP BY
+    proposals = MovieProposal.objects.select_related('proposer').order_by('-vote_count', '-created_at', '-id')
+    
+    total_count = None
+    if cursor:
+        vote_count, created_at, last_id = cursor
+        proposals = proposals.filter(
+            Q(vote_count__lt=vote_count)
+            | Q(vote_count=vote_count, created_at__lt=created_at)
+            | Q(vote_count=vote_count, created_at=created_at, id__lt=last_id)
+        )
+        start_idx = 0
+    elif page:
+        total_count = proposals.count()
+        start_idx = (page - 1) * items_per_page
+    else:
+        start_idx = 0
+    
+    # Fetch one extra row as a cheap "has more" check instead of counting
+    proposals_page = list(proposals[start_idx:start_idx + items_per_page + 1])
+    has_next = len(proposals_page) > items_per_page
+    proposals_page = proposals_page[:items_per_page]
+    next_cursor = _encode_proposal_cursor(proposals_page[-1]) if has_next else None
+    
+    proposals_data = []
+    stale_ids = []  # Proposals whose IMDb data should be refreshed in the background
     
     # Pre-fetch all voter data for all proposals at once (avoid N+1 queries)
     # Get all votes with valid voters for current page proposals
@@ -913,113 +1231,173 @@ def vote_page(request):
             votes_by_proposal[vote.proposal_id] = []
         votes_by_proposal[vote.proposal_id].append(vote.voter.username)
     
+    now = timezone.now()
     for p in proposals_page:
-        # Get voter usernames from our pre-fetched data (no new queries)
-        voter_names = votes_by_proposal.get(p.id, [])
-        
-        imdb_data = {}
-        
-        # Check if we have cached IMDb data (cache for 24 hours)
-        cache_expired = not p.cached_at or (timezone.now() - p.cached_at > timedelta(hours=24))
-        
-        if p.imdb_id and p.cached_imdb_data and not cache_expired:
-            # Use cached data
-            imdb_data = p.cached_imdb_data
-        elif p.imdb_id and cache_expired:
-            # Data expired or missing - fetch fresh (but don't block page load)
-            try:
-                url = f"https://api.imdbapi.dev/titles/{p.imdb_id}"
-                resp = requests.get(url, timeout=3)  # Reduced timeout
-                if resp.status_code == 200:
-                    payload = resp.json()
-                    d = payload.get('title', {}) or payload
-                    img = d.get('primaryImage') or {}
-                    rating = d.get('rating') or {}
-                    
-                    imdb_data = {
-                        "title": d.get('primaryTitle') or d.get('originalTitle') or "",
-                        "year": d.get('startYear') or "",
-                        "plot": (d.get('plotOutline', {}).get('text') if isinstance(d.get('plotOutline'), dict) else ""),
-                        "runtime": d.get('runtimeSeconds'),
-                        "genres": d.get('genres') or [],
-                        "poster": img.get('url') if isinstance(img, dict) else "",
-                        "imdb_rating": rating.get('aggregateRating'),
-                        "imdb_votes": rating.get('voteCount'),
-                    }
-                    
-                    # Cache the data
-                    p.cached_imdb_data = imdb_data
-                    p.cached_at = timezone.now()
-                    proposals_to_cache.append(p)
-            except Exception as e:
-                # If API call fails, use old cached data if available
-                if p.cached_imdb_data:
-                    imdb_data = p.cached_imdb_data
-                print(f"Error fetching IMDb data for {p.imdb_id}: {e}")
+        # Always render from the cached IMDb data, even if stale; expired
+        # entries are refreshed in the background and show up on a later view
+        if is_cache_expired(p, now):
+            stale_ids.append(p.id)
 
-        proposals_with_votes.append({
+        proposals_data.append({
             'id': p.id,
             'title': p.title,
             'proposer': p.proposer.username,
             'proposer_id': p.proposer.id,
             'vote_count': p.vote_count,
             'created_at': p.created_at,
-            'user_voted': p.id in user_votes,
-            'is_proposer': request.user.is_authenticated and request.user == p.proposer,
             'imdb_id': p.imdb_id,
-            'imdb': imdb_data,
-            'voters': voter_names,
+            'imdb': p.cached_imdb_data or {},
+            'voters': votes_by_proposal.get(p.id, []),
         })
     
-    # Bulk update cached proposals (efficient batch operation)
-    if proposals_to_cache:
-        MovieProposal.objects.bulk_update(proposals_to_cache, ['cached_imdb_data', 'cached_at'], batch_size=100)
+    if stale_ids:
+        imdb_refresher.schedule(stale_ids)
     
-    # Calculate pagination info
-    total_pages = (total_count + items_per_page - 1) // items_per_page
-    has_next = page < total_pages
-    has_prev = page > 1
+    return {
+        'proposals': proposals_data,
+        'has_next': has_next,
+        'next_cursor': next_cursor,
+        'total_count': total_count,
+    }
+
+
+def media_description(request, media_id):
+    """Return one movie's description, loaded on demand by the watched-movies cards."""
+    description = Media.objects.filter(pk=media_id).values_list('description', flat=True).first()
+    if description is None:
+        return JsonResponse({'status': 'error', 'message': 'Film nie został znaleziony.'})
+    return JsonResponse({'status': 'success', 'description': description})
+
+
+SEARCH_PAGE_SIZE = 20
+
+
+@versioned_etag('media')
+def media_search(request):
+    """Ranked full-text search over Media titles and descriptions (JSON, ``?q=&page=``)."""
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'status': 'error', 'message': 'Wpisz co najmniej 2 znaki.'})
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
     
-    return render(request, 'pages/vote.html', {
-        'proposals': proposals_with_votes,
-        'watched_movies': None,
-        'is_authenticated': request.user.is_authenticated,
-        'is_admin': request.user.is_authenticated and request.user.username == 'admin',
-        'filter_type': 'proposals',
+    # One extra row tells whether there is a next page without counting
+    hits = search_media(query, limit=SEARCH_PAGE_SIZE + 1, offset=(page - 1) * SEARCH_PAGE_SIZE)
+    has_next = len(hits) > SEARCH_PAGE_SIZE
+    hits = hits[:SEARCH_PAGE_SIZE]
+    
+    movies = Media.objects.only(
+        'id', 'number', 'title', 'year', 'duration', 'rating', 'watched', 'skipped', 'poster_url'
+    ).in_bulk([media_id for media_id, _ in hits])
+    results = [
+        {
+            'id': movies[media_id].number,
+            'media_id': media_id,
+            'title': movies[media_id].title,
+            'year': movies[media_id].year,
+            'duration': movies[media_id].duration,
+            'rating': movies[media_id].rating,
+            'watched': movies[media_id].watched,
+            'skipped': movies[media_id].skipped,
+            'poster_url': movies[media_id].poster_url,
+        }
+        for media_id, _ in hits if media_id in movies
+    ]
+    return JsonResponse({
+        'status': 'success',
+        'query': query,
         'page': page,
-        'total_pages': total_pages,
         'has_next': has_next,
-        'has_prev': has_prev,
-        'total_proposals': total_count,
+        'results': results,
     })
 
 
+@require_POST
 def vote_proposal(request, proposal_id):
+    """Toggle the user's vote. ``?state=on|off`` sets it idempotently so clients can retry."""
     if not request.user.is_authenticated:
         return JsonResponse({'status': 'error', 'message': 'Musisz się zalogować, aby głosować.'})
     
+    state_param = request.GET.get('state') or request.POST.get('state')
+    state = {'on': True, 'off': False}.get(state_param)
+    if state_param and state is None:
+        return JsonResponse({'status': 'error', 'message': 'Nieprawidłowy parametr state (on/off).'})
+    
     try:
-        proposal = MovieProposal.objects.get(id=proposal_id)
-        vote = ProposalVote.objects.filter(proposal=proposal, voter=request.user).first()
-        
-        if vote:
-            vote.delete()
-            action = 'vote_remove'
-            log_action(request, 'vote_remove', proposal.id, proposal.title)
-        else:
-            ProposalVote.objects.create(proposal=proposal, voter=request.user)
-            action = 'vote_add'
-            log_action(request, 'vote_add', proposal.id, proposal.title)
-        
-        vote_count = ProposalVote.objects.filter(proposal=proposal).count()
-        return JsonResponse({
-            'status': 'success',
-            'message': f'Głos {action}.',
-            'vote_count': vote_count,
-            'action': action
-        })
+        voted, vote_count, title, changed = ProposalVote.toggle(proposal_id, request.user, state)
     except MovieProposal.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'Propozycja nie znaleziona.'})
+    
+    action = 'vote_add' if voted else 'vote_remove'
+    if changed:
+        log_action(request, action, proposal_id, title)
+        bump_version('votes')
+        publish('vote', id=proposal_id, vote_count=vote_count)
+    
+    return JsonResponse({
+        'status': 'success',
+        'message': f'Głos {action}.',
+        'vote_count': vote_count,
+        'voted': voted,
+        'action': action
+    })
+
+
+# Comment line sent on idle streams so proxies don't drop the connection
+VOTE_EVENTS_HEARTBEAT = 15
+# Django 4.2 does not notice a client disconnect while streaming, so a stream
+# ends itself after this many seconds and EventSource reconnects; a closed tab
+# holds its subscription for at most this long
+VOTE_EVENTS_MAX_AGE = 300
+
+
+async def vote_events(request):
+    """
+    Server-Sent Events stream of vote counts and proposal add/delete deltas.
+
+    Needs the ASGI entry point (core.asgi): each client is a coroutine waiting
+    on its queue, not a worker thread. Under WSGI the stream is refused with
+    204, which tells EventSource not to reconnect, and the page simply shows
+    the counts from its last load; the render.yaml deployment runs WSGI.
+    """
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import HttpResponse, StreamingHttpResponse
+
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    async def stream():
+        subscription = broadcaster.subscribe()
+        queue = subscription[1]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + VOTE_EVENTS_MAX_AGE
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    event_id, event, data = await asyncio.wait_for(
+                        queue.get(), min(VOTE_EVENTS_HEARTBEAT, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    if remaining <= VOTE_EVENTS_HEARTBEAT:
+                        return
+                    yield ': ping\n\n'
+                    continue
+                payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+                yield f'id: {event_id}\nevent: {event}\ndata: {payload}\n\n'
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 @csrf_exempt
 def delete_proposal(request, proposal_id):
@@ -1036,6 +1414,8 @@ def delete_proposal(request, proposal_id):
         
         title = proposal.title
         proposal.delete()
+        bump_version('proposals', 'votes')
+        publish('proposal_delete', id=proposal_id)
         log_action(request, 'proposal_delete', proposal_id, title)
         return JsonResponse({'status': 'success', 'message': f'Propozycja "{title}" została usunięta.'})
     except MovieProposal.DoesNotExist:
@@ -1055,11 +1435,10 @@ def mark_watched(request, proposal_id):
         return JsonResponse({'status': 'error', 'message': 'Propozycja nie znaleziona.'})
 
     title = (proposal.title or '').strip()
-    title_lower = title.lower()
 
     try:
-        # Try to find existing media with matching title (case-insensitive)
-        media = Media.objects.filter(title__iexact=title).first()
+        # Try to find existing media with matching title (ignoring case, accents and spacing)
+        media = Media.objects.filter(title_key=proposal.title_key).first()
         
         if media:
             # Mark existing media as watched
@@ -1088,6 +1467,8 @@ def mark_watched(request, proposal_id):
             proposal.delete()
             msg = f'Film "{title}" dodany do bazy danych i oznaczony jako obejrzany. Propozycja usunięta.'
         
+        bump_version('proposals', 'votes')
+        publish('proposal_delete', id=proposal_id, watched=True)
         log_action(request, 'movie_mark_watched', proposal_id, proposal.title, 
            f"Marked watched, Movie found: {media is not None}")
         return JsonResponse({'status': 'success', 'message': msg})
@@ -1096,6 +1477,41 @@ def mark_watched(request, proposal_id):
 
 
 
+def _resolve_rated_media(media_id=None, movie_title=None):
+    """Find the Media being rated: by primary key, or by normalized title for older clients."""
+    if media_id:
+        try:
+            return Media.objects.filter(pk=int(media_id)).first()
+        except (TypeError, ValueError):
+            return None
+    if movie_title:
+        return Media.objects.filter(title_key=normalize_title(movie_title)).order_by('-watched', 'number').first()
+    return None
+
+
+def _movie_ratings_payload(media, user=None):
+    """Ratings JSON for one movie: average/count/histogram come from MovieRatingSummary."""
+    from .models import MovieRating, MovieRatingSummary
+    summary = MovieRatingSummary.objects.filter(media=media).first()
+    
+    # Get ratings by user
+    ratings_by_user = list(
+        MovieRating.objects.filter(media=media).values('user_id', 'user__username', 'rating').order_by('-created_at')
+    )
+    user_id = user.id if user is not None and user.is_authenticated else None
+    
+    return {
+        'media_id': media.id,
+        'average_rating': round(summary.average_rating * 2) / 2 if summary else 0,  # Round to nearest 0.5
+        'rating_count': summary.rating_count if summary else 0,
+        'histogram': summary.histogram if summary else {r: 0 for r in range(1, 6)},
+        'user_rating': next((r['rating'] for r in ratings_by_user if r['user_id'] == user_id), None),
+        'ratings_by_user': [
+            {'user__username': r['user__username'], 'rating': r['rating']} for r in ratings_by_user
+        ],
+    }
+
+
 @csrf_exempt
 def rate_movie(request):
     """Handle movie rating submission."""
@@ -1105,37 +1521,38 @@ def rate_movie(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            movie_title = data.get('movie_title')
             rating = data.get('rating')
             
-            if not movie_title or not rating:
+            if not (data.get('media_id') or data.get('movie_title')) or not rating:
                 return JsonResponse({'status': 'error', 'message': 'Brak wymaganych danych.'})
             
             rating = int(rating)
             if rating < 1 or rating > 5:
                 return JsonResponse({'status': 'error', 'message': 'Ocena musi być od 1 do 5.'})
             
-            # Create or update rating
-            from .models import MovieRating
-            movie_rating, created = MovieRating.objects.update_or_create(
-                movie_title=movie_title,
-                user=request.user,
-                defaults={'rating': rating}
-            )
-            
-            # Get all ratings for this movie
-            all_ratings = MovieRating.objects.filter(movie_title=movie_title).values_list('rating', flat=True)
-            avg_rating = sum(all_ratings) / len(all_ratings) if all_ratings else 0
+            media = _resolve_rated_media(data.get('media_id'), data.get('movie_title'))
+            if media is None:
+                return JsonResponse({'status': 'error', 'message': 'Film nie został znaleziony.'})
             
-            # Get ratings by user
-            ratings_by_user = MovieRating.objects.filter(movie_title=movie_title).values('user__username', 'rating').order_by('-created_at')
+            # Create or update rating and keep the per-movie summary in sync
+            from .models import MovieRating, MovieRatingSummary
+            with transaction.atomic():
+                movie_rating = MovieRating.objects.select_for_update().filter(
+                    media=media, user=request.user
+                ).first()
+                previous = movie_rating.rating if movie_rating else None
+                if movie_rating is None:
+                    MovieRating.objects.create(media=media, movie_title=media.title, user=request.user, rating=rating)
+                elif previous != rating:
+                    movie_rating.rating = rating
+                    movie_rating.save(update_fields=['rating', 'updated_at'])
+                MovieRatingSummary.record(media.id, added=rating, removed=previous)
+                bump_version('ratings')
             
             return JsonResponse({
                 'status': 'success',
                 'message': 'Ocena zapisana.',
-                'average_rating': round(avg_rating * 2) / 2,  # Round to nearest 0.5
-                'rating_count': len(all_ratings),
-                'ratings_by_user': list(ratings_by_user)
+                **_movie_ratings_payload(media, request.user),
             })
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': f'Błąd: {str(e)}'})
@@ -1144,39 +1561,91 @@ def rate_movie(request):
 
 
 @csrf_exempt
+@versioned_etag('ratings', 'media')
 def get_movie_ratings(request):
-    """Get ratings for a specific movie."""
+    """Get ratings for a specific movie (``?media_id=`` or legacy ``?movie_title=``)."""
     if request.method == 'GET':
+        media_id = request.GET.get('media_id')
         movie_title = request.GET.get('movie_title')
         
-        if not movie_title:
+        if not media_id and not movie_title:
             return JsonResponse({'status': 'error', 'message': 'Brak tytułu filmu.'})
         
-        from .models import MovieRating
-        all_ratings = MovieRating.objects.filter(movie_title=movie_title).values_list('rating', flat=True)
-        avg_rating = sum(all_ratings) / len(all_ratings) if all_ratings else 0
-        
-        # Get ratings by user
-        ratings_by_user = MovieRating.objects.filter(movie_title=movie_title).values('user__username', 'rating').order_by('-created_at')
-        
-        # Get current user's rating if authenticated
-        user_rating = None
-        if request.user.is_authenticated:
-            rating_obj = MovieRating.objects.filter(movie_title=movie_title, user=request.user).first()
-            if rating_obj:
-                user_rating = rating_obj.rating
+        media = _resolve_rated_media(media_id, movie_title)
+        if media is None:
+            return JsonResponse({'status': 'error', 'message': 'Film nie został znaleziony.'})
         
         return JsonResponse({
             'status': 'success',
-            'average_rating': round(avg_rating * 2) / 2,
-            'rating_count': len(all_ratings),
-            'user_rating': user_rating,
-            'ratings_by_user': list(ratings_by_user)
+            **_movie_ratings_payload(media, request.user),
         })
     
     return JsonResponse({'status': 'error', 'message': 'Nieprawidłowa metoda żądania.'})
 
 
+@csrf_exempt
+@versioned_etag('ratings', 'media')
+def get_movie_ratings_batch(request):
+    """Get ratings for many movies at once, to bootstrap the watched-movies grid.
+
+    Movies come from repeated ``?media_id=`` params, a JSON body
+    ``{"media_ids": [...]}`` (POST), or ``?watched=1`` for all watched movies.
+    Results are keyed by media id. Averages, counts and histograms come from
+    MovieRatingSummary (like get_movie_ratings); the per-user lists for the
+    tooltips are read in one query and grouped per movie.
+    """
+    if request.method == 'GET':
+        media_ids = request.GET.getlist('media_id')
+        all_watched = request.GET.get('watched') == '1'
+    elif request.method == 'POST':
+        try:
+            data = json.loads(request.body or '{}')
+        except json.JSONDecodeError:
+            return JsonResponse({'status': 'error', 'message': 'Nieprawidłowe dane.'})
+        media_ids = data.get('media_ids') or []
+        all_watched = bool(data.get('watched'))
+    else:
+        return JsonResponse({'status': 'error', 'message': 'Nieprawidłowa metoda żądania.'})
+    
+    try:
+        media_ids = [int(media_id) for media_id in media_ids]
+    except (TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Nieprawidłowe dane.'})
+    
+    if not media_ids and not all_watched:
+        return JsonResponse({'status': 'error', 'message': 'Brak filmów.'})
+    
+    from .models import MovieRating, MovieRatingSummary
+    if all_watched:
+        summaries = MovieRatingSummary.objects.filter(media__watched=True)
+    else:
+        summaries = MovieRatingSummary.objects.filter(media_id__in=media_ids)
+    summaries = {summary.media_id: summary for summary in summaries}
+    
+    grouped = {media_id: [] for media_id in [*media_ids, *summaries]}
+    rows = MovieRating.objects.filter(media_id__in=list(grouped)).values(
+        'media_id', 'user_id', 'user__username', 'rating'
+    ).order_by('-created_at')
+    for row in rows:
+        grouped[row['media_id']].append(row)
+    
+    user_id = request.user.id if request.user.is_authenticated else None
+    result = {}
+    for media_id, movie_rows in grouped.items():
+        summary = summaries.get(media_id)
+        result[str(media_id)] = {
+            'average_rating': round(summary.average_rating * 2) / 2 if summary else 0,  # Round to nearest 0.5
+            'rating_count': summary.rating_count if summary else 0,
+            'histogram': summary.histogram if summary else {r: 0 for r in range(1, 6)},
+            'user_rating': next((r['rating'] for r in movie_rows if r['user_id'] == user_id), None),
+            'ratings_by_user': [
+                {'user__username': r['user__username'], 'rating': r['rating']} for r in movie_rows
+            ],
+        }
+    
+    return JsonResponse({'status': 'success', 'ratings': result})
+
+
 @csrf_exempt
 def remove_movie_rating(request):
     """Handle movie rating removal."""
@@ -1186,28 +1655,29 @@ def remove_movie_rating(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            movie_title = data.get('movie_title')
             
-            if not movie_title:
+            if not data.get('media_id') and not data.get('movie_title'):
                 return JsonResponse({'status': 'error', 'message': 'Brak tytułu filmu.'})
             
-            # Delete user's rating
-            from .models import MovieRating
-            MovieRating.objects.filter(movie_title=movie_title, user=request.user).delete()
-            
-            # Get remaining ratings for this movie
-            all_ratings = MovieRating.objects.filter(movie_title=movie_title).values_list('rating', flat=True)
-            avg_rating = sum(all_ratings) / len(all_ratings) if all_ratings else 0
+            media = _resolve_rated_media(data.get('media_id'), data.get('movie_title'))
+            if media is None:
+                return JsonResponse({'status': 'error', 'message': 'Film nie został znaleziony.'})
             
-            # Get ratings by user
-            ratings_by_user = MovieRating.objects.filter(movie_title=movie_title).values('user__username', 'rating').order_by('-created_at')
+            # Delete user's rating and keep the per-movie summary in sync
+            from .models import MovieRating, MovieRatingSummary
+            with transaction.atomic():
+                movie_rating = MovieRating.objects.select_for_update().filter(
+                    media=media, user=request.user
+                ).first()
+                if movie_rating is not None:
+                    movie_rating.delete()
+                    MovieRatingSummary.record(media.id, removed=movie_rating.rating)
+                    bump_version('ratings')
             
             return JsonResponse({
                 'status': 'success',
                 'message': 'Ocena usunięta.',
-                'average_rating': round(avg_rating * 2) / 2 if all_ratings else 0,
-                'rating_count': len(all_ratings),
-                'ratings_by_user': list(ratings_by_user)
+                **_movie_ratings_payload(media, request.user),
             })
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': f'Błąd: {str(e)}'})
@@ -1215,19 +1685,237 @@ def remove_movie_rating(request):
     return JsonResponse({'status': 'error', 'message': 'Nieprawidłowa metoda żądania.'})
 
 
+LOGS_PAGE_SIZE = 100
+# Above this many matching entries the admin log page shows "N+" instead of counting
+LOGS_COUNT_LIMIT = 10000
+
+
+def _encode_log_cursor(entry):
+    """Opaque ?before= token for keyset pagination on (timestamp, id), newest first."""
+    raw = json.dumps([entry.timestamp.isoformat(), entry.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_log_cursor(token):
+    """Decode a ?before= token into (timestamp, id), or None if it is invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        timestamp, entry_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(entry_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_log_time(value, end_of_day=False):
+    """Parse a ``YYYY-MM-DD`` or ``YYYY-MM-DDTHH:MM`` filter value into an aware datetime."""
+    from django.utils import timezone
+    from django.utils.dateparse import parse_date, parse_datetime
+
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            parsed = datetime.combine(day, datetime.max.time() if end_of_day else datetime.min.time())
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _filtered_logs(params):
+    """LogEntry queryset for the admin log filters (action, user, since, until)."""
+    logs = LogEntry.objects.all()
+    filters = {
+        'action': params.get('action', ''),
+        'user': params.get('user', '').strip(),
+        'since': params.get('since', ''),
+        'until': params.get('until', ''),
+    }
+    if filters['action']:
+        logs = logs.filter(action=filters['action'])
+    if filters['user']:
+        if filters['user'] == '-':
+            logs = logs.filter(user__isnull=True)
+        else:
+            user_id = User.objects.filter(username=filters['user']).values_list('id', flat=True).first()
+            logs = logs.filter(user_id=user_id) if user_id is not None else logs.none()
+    since = _parse_log_time(filters['since'])
+    if since:
+        logs = logs.filter(timestamp__gte=since)
+    until = _parse_log_time(filters['until'], end_of_day=True)
+    if until:
+        logs = logs.filter(timestamp__lte=until)
+    return logs, filters
+
+
+def _estimate_log_count(logs, filtered):
+    """
+    Cheap entry count for the page header. Returns (count, is_exact).
+
+    The unfiltered total on PostgreSQL comes from the planner statistics;
+    otherwise counting stops at LOGS_COUNT_LIMIT.
+    """
+    from django.db import connection
+
+    if not filtered and connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [LogEntry._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0], False
+    count = logs.order_by()[:LOGS_COUNT_LIMIT + 1].count()
+    return min(count, LOGS_COUNT_LIMIT), count <= LOGS_COUNT_LIMIT
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def _stream_logs_csv(logs):
+    from django.http import StreamingHttpResponse
+
+    rows = logs.order_by('-timestamp', '-id').values_list(
+        'timestamp', 'user__username', 'action', 'proposal_id', 'proposal_title', 'details'
+    )
+    writer = csv.writer(_Echo())
+
+    def generate():
+        yield writer.writerow(['Data', 'Użytkownik', 'Akcja', 'Propozycja ID', 'Tytuł', 'Szczegóły'])
+        for timestamp, username, action, proposal_id, title, details in rows.iterator(chunk_size=2000):
+            yield writer.writerow([
+                timestamp.isoformat(), username or '', action,
+                proposal_id if proposal_id is not None else '', title, details,
+            ])
+
+    filename = f"logs_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv"
+    response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 def admin_logs(request):
-    """Admin page to view all logs."""
+    """Admin page to view logs, filtered by action, user and time range.
+
+    Entries are paginated newest first with a ``?before=`` keyset cursor on
+    (timestamp, id), served by the (action, timestamp) / (user, timestamp)
+    indexes. ``?export=csv`` streams the whole filtered set as CSV.
+    """
     if not request.user.is_authenticated or request.user.username != 'admin':
-        return redirect('vote_page')  # lub dashboard
+        return redirect('vote')
+    
+    logs, filters = _filtered_logs(request.GET)
+    if request.GET.get('export') == 'csv':
+        return _stream_logs_csv(logs)
     
-    logs = LogEntry.objects.all()[:1000]  # ostatnie 1000 wpisów
+    page = logs.select_related('user').order_by('-timestamp', '-id')
+    cursor = _decode_log_cursor(request.GET.get('before', ''))
+    if cursor:
+        timestamp, entry_id = cursor
+        page = page.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=entry_id))
+    
+    entries = list(page[:LOGS_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(entries) > LOGS_PAGE_SIZE:
+        entries = entries[:LOGS_PAGE_SIZE]
+        next_cursor = _encode_log_cursor(entries[-1])
+    
+    log_count, log_count_exact = _estimate_log_count(logs, filtered=any(filters.values()))
+    query = request.GET.copy()
+    query.pop('before', None)
+    query.pop('export', None)
     
     return render(request, 'pages/admin_logs.html', {
-        'logs': logs,
-        'log_count': LogEntry.objects.count()
+        'logs': entries,
+        'log_count': log_count,
+        'log_count_exact': log_count_exact,
+        'filters': filters,
+        'action_choices': LogEntry.ACTION_CHOICES,
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
+        'filter_query': query.urlencode(),
     })
 
 
+ACTIVITY_DEFAULT_DAYS = 30
+
+
+def _activity_stats(days):
+    """Activity over the last ``days`` days, read from the ActivityRollup table only."""
+    from datetime import timedelta
+    from django.db.models import Sum
+    from django.utils import timezone
+    from .models import ActivityRollup, ActivityRollupState
+
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = ActivityRollup.objects.filter(date__gte=since).order_by()
+
+    per_day = {}
+    for row in rows.values('date', 'action').annotate(total=Sum('count')):
+        per_day.setdefault(row['date'].isoformat(), {})[row['action']] = row['total']
+
+    top_users = [
+        {'username': row['user__username'], 'total': row['total']}
+        for row in rows.filter(user__isnull=False)
+        .values('user__username').annotate(total=Sum('count')).order_by('-total')[:10]
+    ]
+    action_labels = dict(LogEntry.ACTION_CHOICES)
+    per_action = [
+        {'action': row['action'], 'label': action_labels.get(row['action'], row['action']), 'total': row['total']}
+        for row in rows.values('action').annotate(total=Sum('count')).order_by('-total')
+    ]
+    state = ActivityRollupState.objects.filter(name='activity').first()
+
+    return {
+        'since': since.isoformat(),
+        'days': days,
+        'per_day': [{'date': day, 'actions': per_day[day]} for day in sorted(per_day)],
+        'top_users': top_users,
+        'per_action': per_action,
+        'rolled_up_at': state.updated_at.isoformat() if state else None,
+    }
+
+
+def _activity_days(request):
+    try:
+        return min(max(int(request.GET.get('days', ACTIVITY_DEFAULT_DAYS)), 1), 366)
+    except ValueError:
+        return ACTIVITY_DEFAULT_DAYS
+
+
+def admin_activity(request):
+    """Admin page with activity statistics (votes per day, most active users)."""
+    if not request.user.is_authenticated or request.user.username != 'admin':
+        return redirect('vote')
+    
+    stats = _activity_stats(_activity_days(request))
+    for day in stats['per_day']:
+        day['votes'] = day['actions'].get('vote_add', 0)
+        day['vote_removals'] = day['actions'].get('vote_remove', 0)
+        day['proposals'] = day['actions'].get('proposal_create', 0)
+        day['logins'] = day['actions'].get('login', 0)
+        day['total'] = sum(day['actions'].values())
+    return render(request, 'pages/admin_activity.html', {'stats': stats})
+
+
+def admin_activity_stats(request):
+    """Admin JSON: activity statistics from the rollup table (``?days=30``)."""
+    if not request.user.is_authenticated or request.user.username != 'admin':
+        return JsonResponse({'status': 'error', 'message': 'Brak dostępu.'})
+    
+    return JsonResponse({'status': 'success', **_activity_stats(_activity_days(request))})
+
+
 @csrf_exempt
 def remove_watched_movie(request):
     """Admin: remove a movie from the watched list by marking it as unwatched."""
@@ -1242,8 +1930,8 @@ def remove_watched_movie(request):
             if not movie_title:
                 return JsonResponse({'status': 'error', 'message': 'Brak tytułu filmu.'})
             
-            # Find the movie by title (case-insensitive)
-            media = Media.objects.filter(title__iexact=movie_title).first()
+            # Find the movie by title (ignoring case, accents and spacing)
+            media = Media.objects.filter(title_key=normalize_title(movie_title)).first()
             
             if not media:
                 return JsonResponse({'status': 'error', 'message': 'Film nie został znaleziony.'})